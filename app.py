@@ -1,20 +1,44 @@
 import argparse
+import gc
+import json
 import logging
 import threading
 import time
 import webbrowser
-from typing import Optional
+from concurrent.futures import Future
+from typing import Callable, Optional
 
 import numpy as np
 import webrtcvad
 import sounddevice as sd
-from flask import Flask, jsonify, redirect, render_template, request, url_for
-
-from audio_capture import record_block, DEFAULT_SAMPLE_RATE
-from stt_translate import create_model, translate_segment
+from flask import Flask, Response, jsonify, redirect, render_template, request, url_for
+
+from audio_capture import (
+    record_block,
+    kill_child_processes,
+    warm_capture_source,
+    reset_replay_sources,
+    release_replay_sources,
+    DEFAULT_SAMPLE_RATE,
+)
+from log_setup import get_logger, setup_logging, shutdown_logging
+from profiler import ProfilerBusy, allocation_diff, collapsed_text, render_flamegraph, sample_stacks
+from sinks import DEFAULT_QUEUE_SIZE, DEFAULT_ROLL_MINUTES, output_sinks
+from stitching import TranscriptStitcher
+from stt_translate import (
+    DEFAULT_MT_MEMORY_MB,
+    QUALITY_PRESETS,
+    InferenceCancelled,
+    create_model,
+    quality_preset,
+    release_models,
+    translate_segment,
+    translator_pool,
+)
 
 
 app = Flask(__name__)
+log = get_logger("worker")
 
 
 class _SuppressTranscriptLogFilter(logging.Filter):
@@ -34,12 +58,16 @@ logging.getLogger("werkzeug").addFilter(_SuppressTranscriptLogFilter())
 
 
 MAX_VISIBLE_LINES = 3
+SSE_HEARTBEAT_SECONDS = 15.0
 
 
 class TranscriptBuffer:
     def __init__(self) -> None:
         self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
         self._text = ""
+        self._version = 0
+        self._listeners: list[Callable[[int, str], None]] = []
 
     def append(self, new_text: str) -> None:
         if not new_text:
@@ -55,6 +83,8 @@ class TranscriptBuffer:
             if len(lines) > MAX_VISIBLE_LINES:
                 lines = lines[-MAX_VISIBLE_LINES :]
             self._text = "\n".join(lines)
+            version, text = self._bump()
+        self._notify(version, text)
 
     def get(self) -> str:
         with self._lock:
@@ -63,15 +93,145 @@ class TranscriptBuffer:
     def clear(self) -> None:
         with self._lock:
             self._text = ""
+            version, text = self._bump()
+        self._notify(version, text)
+
+    def snapshot(self) -> tuple[int, str]:
+        with self._lock:
+            return self._version, self._text
+
+    def wait_for_change(self, version: int, timeout: float) -> tuple[int, str]:
+        """Block until the version differs from ``version`` or timeout expires."""
+        with self._changed:
+            self._changed.wait_for(lambda: self._version != version, timeout=timeout)
+            return self._version, self._text
+
+    def add_listener(self, callback: Callable[[int, str], None]) -> None:
+        """Register callback(version, text), called after every change.
+
+        Callbacks run on the thread that changed the buffer (usually the
+        worker), so they must only hand the update off, never block.
+        """
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[int, str], None]) -> None:
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _bump(self) -> tuple[int, str]:
+        # Caller holds self._lock.
+        self._version += 1
+        self._changed.notify_all()
+        return self._version, self._text
+
+    def _notify(self, version: int, text: str) -> None:
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(version, text)
+            except Exception as exc:  # noqa: BLE001
+                log.warning("transcript listener failed: %r", exc)
 
 
 transcript_buffer = TranscriptBuffer()
 
 
+class LiveConfig:
+    """Settings of a running worker that can change without a restart.
+
+    The worker takes a snapshot at every segment boundary, so an update
+    never disturbs the segment that is currently being decoded.
+    """
+
+    def __init__(self, values: dict) -> None:
+        self._lock = threading.Lock()
+        self._values = dict(values)
+        self._version = 0
+        # Published by the worker: the model / capture settings actually in
+        # use, the requested ones still warming ({"model": {...}, "capture":
+        # {...}}), and why the last swap was rejected.
+        self.active: dict = {}
+        self.pending: dict[str, dict] = {}
+        self.error: Optional[str] = None
+
+    def snapshot(self) -> tuple[int, dict]:
+        """Requested settings (what the worker is moving towards)."""
+        with self._lock:
+            return self._version, dict(self._values)
+
+    def config(self) -> dict:
+        """Settings in effect: requested cheap settings plus the model /
+        capture settings actually running."""
+        with self._lock:
+            return {**self._values, **self.active}
+
+    def revert(self, failed: dict, in_use: dict) -> None:
+        """Roll keys of a failed swap back to the values still in use.
+
+        Keys the user has changed again since are left alone.
+        """
+        with self._lock:
+            reverted = False
+            for k, v in failed.items():
+                if self._values.get(k) == v and k in in_use:
+                    self._values[k] = in_use[k]
+                    reverted = True
+            if reverted:
+                self._version += 1
+
+    def update(self, changes: dict) -> dict:
+        """Apply changes and return the ones that differ from the current values."""
+        with self._lock:
+            changed = {k: v for k, v in changes.items() if self._values.get(k) != v}
+            if changed:
+                self._values.update(changed)
+                self._version += 1
+            return changed
+
+
+# How long stop/restart waits for a cancelled worker to exit before giving
+# up and reporting it as lingering.
+WORKER_STOP_TIMEOUT = 15.0
+
+MIN_SEGMENT_SECONDS = 1.0
+MAX_SEGMENT_SECONDS = 30.0
+# At most this share of each window is repeated from the previous one.
+MAX_OVERLAP_RATIO = 0.5
+
+DEFAULT_WORKER_CONFIG = {
+    "device_mode": "cpu",
+    "audio_device": None,
+    "segment_seconds": 8.0,
+    "overlap_seconds": 0.0,
+    "quality": "ultra_low",
+    "mode": "translate",
+    "language": None,
+    "capture_mode": "loopback",
+    "vad_level": 0,
+    "srt_url": None,
+    "replay_path": None,
+    "replay_loop": True,
+    "replay_jitter": 0.0,
+    "draft_quality": None,
+}
+# Changing any of these may load new models / swap the capture source
+# (prepared in the background first).
+MODEL_KEYS = ("device_mode", "quality", "draft_quality")
+CAPTURE_KEYS = ("capture_mode", "audio_device", "srt_url", "replay_path", "replay_loop", "replay_jitter")
+
 worker_thread: Optional[threading.Thread] = None
 worker_stop_event: Optional[threading.Event] = None
 worker_lock = threading.Lock()
 worker_config: dict | None = None
+worker_live: Optional[LiveConfig] = None
+# Serialises start/stop so a restart's join does not hold worker_lock and
+# block status requests.
+worker_lifecycle_lock = threading.Lock()
+lingering_workers: list[threading.Thread] = []
+_worker_seq = 0
 
 
 def _apply_vad_filter(audio: np.ndarray, sample_rate: int, vad_level: int) -> np.ndarray:
@@ -114,32 +274,193 @@ def _apply_vad_filter(audio: np.ndarray, sample_rate: int, vad_level: int) -> np
     return stacked.astype(np.float32) / 32768.0
 
 
-def worker_loop(
-    device_mode: str,
-    audio_device: Optional[int],
-    segment_seconds: float,
-    quality: str,
-    stop_event: threading.Event,
-    mode: str,
-    language: Optional[str],
-    capture_mode: str = "loopback",
-    vad_level: int = 0,
-    srt_url: Optional[str] = None,
-) -> None:
-    model = create_model(device_mode, quality=quality)
+def _model_ids(cfg: dict) -> tuple[str, ...]:
+    return tuple(quality_preset(q)["model_id"] for q in (cfg["quality"], cfg.get("draft_quality")) if q)
+
+
+def _model_key(cfg: dict) -> tuple:
+    draft = cfg.get("draft_quality")
+    return (
+        cfg["device_mode"],
+        quality_preset(cfg["quality"])["model_id"],
+        quality_preset(draft)["model_id"] if draft else None,
+    )
+
+
+def _load_models(cfg: dict, current: Optional[dict] = None) -> dict:
+    """Resolve the models and decode presets for a worker config.
+
+    If ``current`` already holds the same checkpoints, they are reused and
+    only the presets (beam size, thresholds) change.
+    """
+    device_mode = cfg["device_mode"]
+    quality = cfg["quality"]
+    draft_quality = cfg.get("draft_quality")
+    key = _model_key(cfg)
+    if current is not None and current["key"] == key:
+        model = current["model"]
+    else:
+        model = create_model(device_mode, quality=draft_quality or quality)
+    recheck_model: Optional[Callable] = None
+    if draft_quality:
+        # Draft mode: decode everything with the cheap preset and only load
+        # the full `quality` model when a segment needs re-checking.
+        recheck_model = lambda: create_model(device_mode, quality=quality)  # noqa: E731
+    return {
+        "key": key,
+        "settings": {k: cfg.get(k) for k in MODEL_KEYS},
+        "model": model,
+        "recheck_model": recheck_model,
+        "decode_quality": draft_quality or quality,
+        "quality": quality,
+    }
+
+
+def _overlap_seconds(cfg: dict) -> float:
+    overlap = float(cfg.get("overlap_seconds") or 0.0)
+    return min(max(overlap, 0.0), cfg["segment_seconds"] * MAX_OVERLAP_RATIO)
+
+
+def _capture_kwargs(cfg: dict) -> dict:
+    return {key: cfg.get(key) for key in CAPTURE_KEYS}
+
+
+def _warm_in_background(name: str, fn: Callable[[], object]) -> Future:
+    """Run fn on a short-lived thread so the worker keeps capturing meanwhile."""
+    future: Future = Future()
+
+    def _run() -> None:
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn())
+        except BaseException as exc:  # noqa: BLE001
+            future.set_exception(exc)
+
+    threading.Thread(target=_run, name=name, daemon=True).start()
+    return future
+
+
+def worker_loop(live: LiveConfig, stop_event: threading.Event) -> None:
+    version, cfg = live.snapshot()
+    # Drop checkpoints from earlier configurations that this worker won't use.
+    release_models(keep=_model_ids(cfg))
+    models = _load_models(cfg)
+    capture = _capture_kwargs(cfg)
     sample_rate = DEFAULT_SAMPLE_RATE
+    # Each worker plays a replay file from the start; the PCM stays cached.
+    reset_replay_sources()
+
+    # Model / capture changes are prepared in the background and swapped in
+    # at a segment boundary once ready; until then the old ones keep running.
+    pending_models: Optional[tuple[tuple, Future, dict]] = None
+    pending_capture: Optional[tuple[dict, Future]] = None
+
+    # Overlap mode: the end of the previous window is decoded again at the
+    # start of the next one, and the repeated text is stitched away.
+    tail = np.zeros(0, dtype=np.float32)
+    stitcher = TranscriptStitcher()
 
     while not stop_event.is_set():
+        new_version, new_cfg = live.snapshot()
+        if new_version != version:
+            version, cfg = new_version, new_cfg
+            key = _model_key(cfg)
+            if key == models["key"]:
+                models = _load_models(cfg, current=models)
+                pending_models = None
+            elif pending_models is None or pending_models[0] != key:
+                log.info("loading models %r in the background", key)
+                pending_models = (
+                    key,
+                    _warm_in_background("mst-warm-model", lambda c=cfg: _load_models(c)),
+                    {k: cfg.get(k) for k in MODEL_KEYS},
+                )
+
+            new_capture = _capture_kwargs(cfg)
+            if new_capture == capture:
+                pending_capture = None
+            elif pending_capture is None or pending_capture[0] != new_capture:
+                log.info("warming capture source %r", new_capture)
+                pending_capture = (
+                    new_capture,
+                    _warm_in_background(
+                        "mst-warm-capture",
+                        lambda c=new_capture: warm_capture_source(
+                            c["capture_mode"],
+                            samplerate=sample_rate,
+                            device=c["audio_device"],
+                            srt_url=c["srt_url"],
+                            replay_path=c["replay_path"],
+                            cancel_event=stop_event,
+                        ),
+                    ),
+                )
+
+        if pending_models is not None and pending_models[1].done():
+            try:
+                # Re-apply the latest presets in case quality changed again
+                # within the same checkpoints while loading.
+                models = _load_models(cfg, current=pending_models[1].result())
+                release_models(keep=_model_ids(cfg))
+                live.error = None
+                log.info("switched to models %r", models["key"])
+            except Exception as exc:  # noqa: BLE001
+                live.error = f"model: {exc!r}"
+                log.error("could not load models %r, keeping the current ones: %r", pending_models[0], exc)
+                live.revert(pending_models[2], models["settings"])
+            pending_models = None
+
+        if pending_capture is not None and pending_capture[1].done():
+            try:
+                pending_capture[1].result()
+                capture = pending_capture[0]
+                if capture["capture_mode"] == "replay":
+                    reset_replay_sources(capture["replay_path"])
+                tail = tail[:0]
+                stitcher.reset()
+                live.error = None
+                log.info("switched capture source to %r", capture)
+            except Exception as exc:  # noqa: BLE001
+                live.error = f"capture: {exc!r}"
+                log.error("capture source %r is not usable, keeping the current one: %r", pending_capture[0], exc)
+                live.revert(pending_capture[0], capture)
+            pending_capture = None
+
+        # Build both dicts first and publish each with a single assignment:
+        # GET /api/worker copies them from another thread without a lock.
+        pending: dict[str, dict] = {}
+        if pending_models is not None:
+            pending["model"] = pending_models[2]
+        if pending_capture is not None:
+            pending["capture"] = pending_capture[0]
+        live.active = {**models["settings"], **capture}
+        live.pending = pending
+
+        overlap = _overlap_seconds(cfg)
+        if bool(overlap) != bool(stitcher.overlap_seconds):
+            # Overlap switched on or off: start over without a shared window.
+            tail = tail[:0]
+            stitcher.reset()
+        stitcher.overlap_seconds = overlap
+
         try:
             audio = record_block(
-                segment_seconds,
+                cfg["segment_seconds"] - overlap,
                 samplerate=sample_rate,
-                device=audio_device,
-                capture_mode=capture_mode,
-                srt_url=srt_url,
+                device=capture["audio_device"],
+                capture_mode=capture["capture_mode"],
+                srt_url=capture["srt_url"],
+                replay_path=capture["replay_path"],
+                replay_loop=capture["replay_loop"],
+                replay_jitter=capture["replay_jitter"],
+                cancel_event=stop_event,
             )
+            segment_end = time.time()
+            segment_start = segment_end - audio.size / sample_rate
             # Sanitize audio to avoid NaNs / infs / absurd amplitudes propagating into faster-whisper.
             if audio.size == 0:
+                tail = tail[:0]
+                stitcher.reset()
                 continue
 
             # Replace NaNs / infs with safe finite values.
@@ -154,15 +475,16 @@ def worker_loop(
             # environments so that quiet background sounds are skipped.
             if np.isfinite(max_abs) and max_abs < 6e-3:
                 # Low enough that this is effectively silence; skip.
+                tail = tail[:0]
+                stitcher.reset()
                 time.sleep(0.05)
                 continue
 
             # If the amplitude is astronomically large, consider this segment corrupt and skip it.
             if not np.isfinite(max_abs) or max_abs > 1000.0:
-                print(
-                    "[worker warning] audio segment looks corrupt (max_abs=%.4e), skipping"
-                    % max_abs,
-                )
+                log.warning("audio segment looks corrupt (max_abs=%.4e), skipping", max_abs)
+                tail = tail[:0]
+                stitcher.reset()
                 time.sleep(0.1)
                 continue
 
@@ -170,36 +492,94 @@ def worker_loop(
             if max_abs > 1.0:
                 audio = audio / max_abs
 
-            # Debug: basic stats of the captured audio block
-            try:
-                print(
-                    "[worker] captured",
+            # Debug: basic stats of the captured audio block. These are three
+            # extra passes over the array, so only compute them when needed.
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug(
+                    "captured %d samples, min=%.4f max=%.4f mean=%.4f",
                     audio.shape[0],
-                    "samples, min=%.4f max=%.4f mean=%.4f"
-                    % (float(audio.min()), float(audio.max()), float(audio.mean())),
+                    float(audio.min()),
+                    float(audio.max()),
+                    float(audio.mean()),
                 )
-            except Exception as capture_exc:  # noqa: BLE001
-                print(f"[worker debug] failed to summarise audio block: {capture_exc!r}")
-            audio_filtered = _apply_vad_filter(audio, sample_rate, vad_level)
+            if overlap:
+                window = np.concatenate([tail, audio]) if tail.size else audio
+                tail = window[-int(overlap * sample_rate) :]
+                audio = window
+            audio_filtered = _apply_vad_filter(audio, sample_rate, cfg["vad_level"])
             if audio_filtered.size == 0:
+                stitcher.reset()
                 time.sleep(0.05)
                 continue
             audio = audio_filtered
             text = translate_segment(
-                model,
+                models["model"],
                 audio,
                 sample_rate=sample_rate,
-                mode=mode,
-                language=language,
-                quality=quality,
+                mode=cfg["mode"],
+                language=cfg["language"],
+                quality=models["decode_quality"],
+                recheck_model=models["recheck_model"],
+                recheck_quality=models["quality"],
+                cancel_event=stop_event,
+                stitcher=stitcher if overlap else None,
             )
-            print(f"[worker] transcript: {text!r}")
+            log.info("transcript: %r", text)
             if text:
                 transcript_buffer.append(text)
+                output_sinks.publish(
+                    {
+                        "text": text,
+                        "start": segment_start,
+                        "end": segment_end,
+                        "mode": cfg["mode"],
+                        "language": cfg["language"],
+                    }
+                )
+        except InferenceCancelled:
+            break
         except Exception as exc:  # noqa: BLE001
             # Keep going even if one segment fails.
-            print(f"[worker error] {exc!r}")
-            time.sleep(1.0)
+            log.error("segment failed: %r", exc)
+            stop_event.wait(1.0)
+    log.info("worker %s stopped", threading.current_thread().name)
+
+
+def _shutdown_worker(thread: Optional[threading.Thread], stop_event: Optional[threading.Event]) -> bool:
+    """Cancel a worker and wait until it has exited.
+
+    Returns False (and records the thread as lingering) if it is still
+    running after WORKER_STOP_TIMEOUT, e.g. while a model is loading.
+    """
+    if stop_event is not None:
+        stop_event.set()
+    if thread is None or not thread.is_alive():
+        return True
+    thread.join(timeout=WORKER_STOP_TIMEOUT)
+    if thread.is_alive():
+        # Last resort for a capture that ignored the cancel request.
+        if kill_child_processes():
+            thread.join(timeout=1.0)
+    if thread.is_alive():
+        log.warning(
+            "worker %s did not stop within %.0fs; it still holds its model and CPU",
+            thread.name,
+            WORKER_STOP_TIMEOUT,
+        )
+        with worker_lock:
+            lingering_workers.append(thread)
+        return False
+    return True
+
+
+class WorkerBusy(RuntimeError):
+    """The previous worker has not exited yet, so a new one is not started."""
+
+
+def _lingering_worker_names() -> list[str]:
+    with worker_lock:
+        lingering_workers[:] = [t for t in lingering_workers if t.is_alive()]
+        return [t.name for t in lingering_workers]
 
 
 def start_worker(
@@ -212,55 +592,98 @@ def start_worker(
     capture_mode: str = "loopback",
     vad_level: int = 0,
     srt_url: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    replay_loop: bool = True,
+    replay_jitter: float = 0.0,
+    draft_quality: Optional[str] = None,
+    overlap_seconds: float = 0.0,
 ) -> None:
-    global worker_thread, worker_stop_event, worker_config
-    with worker_lock:
-        if worker_stop_event is not None:
-            worker_stop_event.set()
-        if worker_thread is not None and worker_thread.is_alive():
-            worker_thread.join(timeout=1.0)
-
-        stop_event = threading.Event()
-        worker_stop_event = stop_event
-        worker_config = {
-            "device_mode": device_mode,
-            "audio_device": audio_device,
-            "segment_seconds": segment_seconds,
-            "quality": quality,
-            "mode": mode,
-            "language": language,
-            "capture_mode": capture_mode,
-            "vad_level": vad_level,
-            "srt_url": srt_url,
-        }
+    """(Re)start the worker from scratch. Use update_worker() to change a running one.
+
+    Raises WorkerBusy while an earlier worker is still lingering, so models
+    and capture threads never stack up; retry once it has exited.
+    """
+    global worker_thread, worker_stop_event, worker_config, worker_live, _worker_seq
+    with worker_lifecycle_lock:
+        with worker_lock:
+            old_thread, old_stop_event = worker_thread, worker_stop_event
+            worker_thread = None
+            worker_stop_event = None
+            worker_live = None
+        if not _shutdown_worker(old_thread, old_stop_event) or _lingering_worker_names():
+            raise WorkerBusy(f"previous worker still running: {', '.join(_lingering_worker_names())}")
+        _worker_seq += 1
 
-        def _run() -> None:
-            worker_loop(
-                device_mode,
-                audio_device,
-                segment_seconds,
-                quality,
-                stop_event,
-                mode,
-                language,
-                capture_mode,
-                vad_level,
-                srt_url,
+        with worker_lock:
+            stop_event = threading.Event()
+            worker_stop_event = stop_event
+            worker_config = {
+                "device_mode": device_mode,
+                "audio_device": audio_device,
+                "segment_seconds": segment_seconds,
+                "quality": quality,
+                "mode": mode,
+                "language": language,
+                "capture_mode": capture_mode,
+                "vad_level": vad_level,
+                "srt_url": srt_url,
+                "replay_path": replay_path,
+                "replay_loop": replay_loop,
+                "replay_jitter": replay_jitter,
+                "draft_quality": draft_quality,
+                "overlap_seconds": overlap_seconds,
+            }
+            live = LiveConfig(worker_config)
+            worker_live = live
+            worker_thread = threading.Thread(
+                target=worker_loop,
+                args=(live, stop_event),
+                name=f"mst-worker-{_worker_seq}",
+                daemon=True,
             )
+            worker_thread.start()
 
-        worker_thread = threading.Thread(target=_run, daemon=True)
-        worker_thread.start()
 
+def update_worker(changes: dict) -> Optional[dict]:
+    """Apply settings to the running worker without restarting it.
 
-def stop_worker() -> None:
-    global worker_thread, worker_stop_event
+    Returns the settings that actually changed, or None if no worker is
+    running.
+    """
+    global worker_config
     with worker_lock:
-        if worker_stop_event is not None:
-            worker_stop_event.set()
-        if worker_thread is not None and worker_thread.is_alive():
-            worker_thread.join(timeout=1.0)
-        worker_thread = None
-        worker_stop_event = None
+        if worker_live is None or worker_thread is None or not worker_thread.is_alive():
+            return None
+        changed = worker_live.update(changes)
+        worker_config = worker_live.snapshot()[1]
+    if changed:
+        log.info("worker settings updated: %r", changed)
+    return changed
+
+
+def stop_worker() -> bool:
+    """Stop the worker and free its models.
+
+    Returns True once the worker thread has exited and its capture process
+    and models are released, False if it is still lingering.
+    """
+    global worker_thread, worker_stop_event, worker_live, worker_config
+    with worker_lifecycle_lock:
+        with worker_lock:
+            old_thread, old_stop_event = worker_thread, worker_stop_event
+            if worker_live is not None:
+                worker_config = worker_live.config()
+            worker_thread = None
+            worker_stop_event = None
+            worker_live = None
+        released = _shutdown_worker(old_thread, old_stop_event)
+        # Drop the cached models and replay audio; a lingering worker still
+        # holds its own references, which are freed when it finally exits.
+        release_models()
+        translator_pool.clear()
+        release_replay_sources()
+        gc.collect()
+        return released
 
 
 @app.route("/")
@@ -283,6 +706,34 @@ def get_transcript():  # type: ignore[override]
     return jsonify({"text": transcript_buffer.get()})
 
 
+@app.route("/transcript/stream")
+def stream_transcript():  # type: ignore[override]
+    """Server-Sent Events stream of the transcript text.
+
+    Sends the current text immediately and then one event per change, plus a
+    comment line every SSE_HEARTBEAT_SECONDS to keep proxies from timing out.
+    Under --serve this path is answered by the asyncio server instead, which
+    does not need a thread per connection.
+    """
+
+    def _events():
+        version, text = transcript_buffer.snapshot()
+        yield f"data: {json.dumps({'text': text})}\n\n"
+        while True:
+            new_version, text = transcript_buffer.wait_for_change(version, SSE_HEARTBEAT_SECONDS)
+            if new_version == version:
+                yield ": keepalive\n\n"
+                continue
+            version = new_version
+            yield f"data: {json.dumps({'text': text})}\n\n"
+
+    return Response(
+        _events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-store", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.route("/api/transcript/clear", methods=["POST"])
 def clear_transcript():  # type: ignore[override]
     """Clear the current transcript text buffer."""
@@ -322,90 +773,241 @@ def api_devices():  # type: ignore[override]
         return jsonify({"error": repr(exc)}), 500
 
 
+@app.route("/api/profile")
+def api_profile():  # type: ignore[override]
+    """Profile the running process for a while and return the result.
+
+    Query: seconds (default 10), mode=cpu|memory,
+      cpu:    format=collapsed|svg, hz (default 100), threads (name filter,
+              e.g. "mst-worker")
+      memory: top (default 30), group_by=lineno|filename|traceback
+    Only one profile runs at a time (409 otherwise).
+    """
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        hz = float(request.args.get("hz", 100))
+        top = int(request.args.get("top", 30))
+    except (TypeError, ValueError):
+        return jsonify({"error": "seconds, hz and top must be numbers"}), 400
+    mode = request.args.get("mode", "cpu")
+    try:
+        if mode == "memory":
+            return jsonify(allocation_diff(seconds, top=top, group_by=request.args.get("group_by", "lineno")))
+        if mode != "cpu":
+            return jsonify({"error": "mode must be cpu or memory"}), 400
+        stacks = sample_stacks(seconds, hz=hz, thread_filter=request.args.get("threads") or None)
+    except ProfilerBusy as exc:
+        return jsonify({"error": str(exc)}), 409
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    if request.args.get("format") == "svg":
+        title = f"moblin-smart-translation: {seconds:g}s @ {hz:g} Hz, {sum(stacks.values())} samples"
+        return Response(render_flamegraph(stacks, title=title), mimetype="image/svg+xml")
+    return Response(collapsed_text(stacks), mimetype="text/plain")
+
+
+@app.route("/api/sinks", methods=["GET", "POST"])
+def api_sinks():  # type: ignore[override]
+    """Get or replace the caption output sinks.
+
+    GET: configured sink specs with queue / written / dropped counters.
+    POST: {sinks: ["srt:captions/live.srt", "udp://127.0.0.1:9000", ...]}
+    """
+    if request.method == "POST":
+        data = request.get_json(silent=True) or {}
+        specs = data.get("sinks")
+        if not isinstance(specs, list):
+            return jsonify({"error": "sinks must be a list of strings"}), 400
+        try:
+            output_sinks.configure([str(s) for s in specs])
+        except (ValueError, OSError) as exc:
+            return jsonify({"error": str(exc)}), 400
+    return jsonify(
+        {
+            "sinks": output_sinks.specs(),
+            "stats": output_sinks.stats(),
+            "queue_size": output_sinks.queue_size,
+            "roll_minutes": output_sinks.roll_minutes,
+        }
+    )
+
+
+def _parse_worker_request(data: dict, cfg: dict) -> tuple[dict, Optional[str]]:
+    """Build a worker config from a POST body, falling back to ``cfg``.
+
+    Returns (config, error message or None).
+    """
+    audio_device_value = data.get("audio_device", cfg.get("audio_device"))
+    audio_device: Optional[int]
+    if audio_device_value in (None, ""):
+        audio_device = None
+    else:
+        try:
+            audio_device = int(audio_device_value)
+        except (TypeError, ValueError):
+            return cfg, "invalid audio_device"
+
+    mode_value = str(data.get("mode") or cfg.get("mode") or "translate")
+    language_value = data.get("language", cfg.get("language", None))
+    quality_value = str(data.get("quality") or cfg.get("quality") or "ultra_low")
+    device_mode_value = str(data.get("device_mode") or cfg.get("device_mode") or "cpu")
+    capture_mode_value = str(data.get("capture_mode") or cfg.get("capture_mode") or "loopback")
+    draft_quality_raw = data.get("draft_quality", cfg.get("draft_quality", None))
+    draft_quality_value = str(draft_quality_raw).strip().lower() if draft_quality_raw else None
+    if draft_quality_value in ("", "none"):
+        draft_quality_value = None
+    if draft_quality_value is not None:
+        if draft_quality_value not in QUALITY_PRESETS:
+            return cfg, "invalid draft_quality"
+        # A draft only helps when it is lighter than the main preset
+        # (QUALITY_PRESETS is ordered from lightest to heaviest).
+        presets = list(QUALITY_PRESETS)
+        main = quality_value.lower()
+        if main not in presets or presets.index(draft_quality_value) >= presets.index(main):
+            draft_quality_value = None
+    vad_level_raw = data.get("vad_level", cfg.get("vad_level", 0))
+    try:
+        vad_level_value = int(vad_level_raw)
+    except (TypeError, ValueError):
+        vad_level_value = 0
+    if vad_level_value < 0:
+        vad_level_value = 0
+    if vad_level_value > 3:
+        vad_level_value = 3
+    try:
+        segment_seconds_value = float(data.get("segment_seconds", cfg.get("segment_seconds", 8.0)) or 8.0)
+    except (TypeError, ValueError):
+        return cfg, "invalid segment_seconds"
+    segment_seconds_value = min(max(segment_seconds_value, MIN_SEGMENT_SECONDS), MAX_SEGMENT_SECONDS)
+    try:
+        overlap_seconds_value = float(data.get("overlap_seconds", cfg.get("overlap_seconds", 0.0)) or 0.0)
+    except (TypeError, ValueError):
+        return cfg, "invalid overlap_seconds"
+    overlap_seconds_value = min(max(overlap_seconds_value, 0.0), segment_seconds_value * MAX_OVERLAP_RATIO)
+
+    srt_url_value_raw = data.get("srt_url", cfg.get("srt_url", None))
+    srt_url_value: Optional[str]
+    if srt_url_value_raw is None:
+        srt_url_value = None
+    else:
+        srt_url_value = str(srt_url_value_raw).strip()
+        if srt_url_value == "":
+            srt_url_value = None
+
+    if capture_mode_value == "srt" and not srt_url_value:
+        return cfg, "srt_url is required when capture_mode is 'srt'"
+
+    replay_path_raw = data.get("replay_path", cfg.get("replay_path", None))
+    replay_path_value = str(replay_path_raw).strip() if replay_path_raw else None
+    if capture_mode_value == "replay" and not replay_path_value:
+        return cfg, "replay_path is required when capture_mode is 'replay'"
+    replay_loop_value = bool(data.get("replay_loop", cfg.get("replay_loop", True)))
+    try:
+        replay_jitter_value = max(0.0, float(data.get("replay_jitter", cfg.get("replay_jitter", 0.0)) or 0.0))
+    except (TypeError, ValueError):
+        replay_jitter_value = 0.0
+
+    return {
+        "device_mode": device_mode_value,
+        "audio_device": audio_device,
+        "segment_seconds": segment_seconds_value,
+        "quality": quality_value,
+        "mode": mode_value,
+        "language": language_value,
+        "capture_mode": capture_mode_value,
+        "vad_level": vad_level_value,
+        "srt_url": srt_url_value,
+        "replay_path": replay_path_value,
+        "replay_loop": replay_loop_value,
+        "replay_jitter": replay_jitter_value,
+        "draft_quality": draft_quality_value,
+        "overlap_seconds": overlap_seconds_value,
+    }, None
+
+
 @app.route("/api/worker", methods=["GET", "POST"])
 def api_worker():  # type: ignore[override]
     """Get or control the audio worker.
 
-    GET: returns running state and current config.
-    POST: {action: "start"|"stop", audio_device?: int|null}
+    GET: returns running state, current config, loaded translators and any
+         lingering (cancelled but not yet exited) worker threads.
+    POST: {action: "start"|"update"|"stop", audio_device?: int|null, ...}
+          "start" on a running worker (and "update") applies the settings
+          live: presets, VAD, mode and segment length take effect at the next
+          segment; a new capture source or checkpoint is prepared in the
+          background and swapped in when ready. GET "config" shows what is
+          in use and "pending" the requested values still warming; a failed
+          swap keeps (and reports) the old values, with "reconfigure_error".
+          Pass restart=true to force a full restart instead.
+          "stop" returns only after the worker has exited and its models are
+          released (released=false if it is still lingering).
     """
-    global worker_config
-
     if request.method == "GET":
         with worker_lock:
             running = worker_thread is not None and worker_thread.is_alive()
-            cfg = worker_config or {}
-        return jsonify({"running": running, "config": cfg})
+            if worker_live is not None:
+                cfg = worker_live.config()
+                pending = dict(worker_live.pending)
+                reconfigure_error = worker_live.error
+            else:
+                cfg = worker_config or {}
+                pending = {}
+                reconfigure_error = None
+        return jsonify(
+            {
+                "running": running,
+                "config": cfg,
+                "pending": pending,
+                "reconfigure_error": reconfigure_error,
+                "translators": translator_pool.stats(),
+                "lingering_workers": _lingering_worker_names(),
+            }
+        )
 
     data = request.get_json(silent=True) or {}
     action = str(data.get("action", "")).lower()
 
     if action == "stop":
-        stop_worker()
-        return jsonify({"ok": True, "running": False})
+        released = stop_worker()
+        return jsonify(
+            {
+                "ok": True,
+                "running": False,
+                "released": released,
+                "lingering_workers": _lingering_worker_names(),
+            }
+        )
 
-    if action == "start":
+    if action in ("start", "update"):
         with worker_lock:
-            cfg = worker_config or {
-                "device_mode": "cpu",
-                "audio_device": None,
-                "segment_seconds": 8.0,
-                "quality": "ultra_low",
-                "mode": "translate",
-                "language": None,
-                "capture_mode": "loopback",
-                "vad_level": 0,
-                "srt_url": None,
-            }
+            # Partial updates apply on top of the requested settings, so
+            # they do not cancel a swap that is still warming.
+            if worker_live is not None:
+                cfg = worker_live.snapshot()[1]
+            else:
+                cfg = worker_config or DEFAULT_WORKER_CONFIG
+            running = worker_thread is not None and worker_thread.is_alive()
+        new_cfg, error = _parse_worker_request(data, cfg)
+        if error:
+            return jsonify({"error": error}), 400
+
+        # A running worker is reconfigured in place unless a full restart is
+        # asked for explicitly.
+        if running and not data.get("restart"):
+            changed = update_worker(new_cfg)
+            if changed is not None:
+                return jsonify({"ok": True, "running": True, "updated": sorted(changed)})
+        if action == "update":
+            return jsonify({"error": "worker is not running"}), 409
 
-        audio_device_value = data.get("audio_device")
-        audio_device: Optional[int]
-        if audio_device_value in (None, ""):
-            audio_device = None
-        else:
-            try:
-                audio_device = int(audio_device_value)
-            except (TypeError, ValueError):
-                return jsonify({"error": "invalid audio_device"}), 400
-
-        mode_value = str(data.get("mode") or cfg.get("mode") or "translate")
-        language_value = data.get("language", cfg.get("language", None))
-        quality_value = str(data.get("quality") or cfg.get("quality") or "ultra_low")
-        device_mode_value = str(data.get("device_mode") or cfg.get("device_mode") or "cpu")
-        capture_mode_value = str(data.get("capture_mode") or cfg.get("capture_mode") or "loopback")
-        vad_level_raw = data.get("vad_level", cfg.get("vad_level", 0))
         try:
-            vad_level_value = int(vad_level_raw)
-        except (TypeError, ValueError):
-            vad_level_value = 0
-        if vad_level_value < 0:
-            vad_level_value = 0
-        if vad_level_value > 3:
-            vad_level_value = 3
-
-        srt_url_value_raw = data.get("srt_url", cfg.get("srt_url", None))
-        srt_url_value: Optional[str]
-        if srt_url_value_raw is None:
-            srt_url_value = None
-        else:
-            srt_url_value = str(srt_url_value_raw).strip()
-            if srt_url_value == "":
-                srt_url_value = None
-
-        if capture_mode_value == "srt" and not srt_url_value:
-            return jsonify({"error": "srt_url is required when capture_mode is 'srt'"}), 400
-
-        start_worker(
-            device_mode_value,
-            audio_device,
-            float(cfg.get("segment_seconds", 8.0)),
-            quality_value,
-            mode_value,
-            language_value,
-            capture_mode_value,
-            vad_level_value,
-            srt_url_value,
-        )
+            start_worker(**new_cfg)
+        except WorkerBusy as exc:
+            return (
+                jsonify({"error": str(exc), "running": False, "lingering_workers": _lingering_worker_names()}),
+                409,
+            )
         return jsonify({"ok": True, "running": True})
 
     return jsonify({"error": "invalid action"}), 400
@@ -442,11 +1044,108 @@ def parse_args():
     )
     parser.add_argument("--host", default="127.0.0.1", help="Flask bind host")
     parser.add_argument("--port", type=int, default=5000, help="Flask bind port")
+    parser.add_argument(
+        "--mt-memory-mb",
+        type=float,
+        default=None,
+        help=(
+            "Memory budget for loaded translation models; least recently used "
+            f"models are unloaded above it. Default: $MST_MT_MEMORY_MB or {DEFAULT_MT_MEMORY_MB}"
+        ),
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help=(
+            "Run under the production asyncio server (uvicorn) instead of Flask's "
+            "development server. Recommended with many OBS/browser sources"
+        ),
+    )
+    parser.add_argument(
+        "--serve-threads",
+        type=int,
+        default=16,
+        help="--serve: threads running normal (non-streaming) requests. Default: 16",
+    )
+    parser.add_argument(
+        "--max-connections",
+        type=int,
+        default=512,
+        help="--serve: maximum concurrent connections before answering 503. Default: 512",
+    )
+    parser.add_argument(
+        "--max-streams",
+        type=int,
+        default=256,
+        help="--serve: maximum concurrent /transcript/stream clients. Default: 256",
+    )
+    parser.add_argument(
+        "--graceful-timeout",
+        type=float,
+        default=10.0,
+        help="--serve: seconds to let in-flight requests finish on shutdown. Default: 10",
+    )
+    parser.add_argument(
+        "--sink",
+        action="append",
+        default=None,
+        metavar="SPEC",
+        help=(
+            "Also write captions to a sink (repeatable): srt:PATH, vtt:PATH, jsonl:PATH, "
+            "udp://HOST:PORT or tcp://HOST:PORT. Can be changed later on the settings page"
+        ),
+    )
+    parser.add_argument(
+        "--sink-queue-size",
+        type=int,
+        default=DEFAULT_QUEUE_SIZE,
+        help=f"Captions buffered per sink before the oldest are dropped. Default: {DEFAULT_QUEUE_SIZE}",
+    )
+    parser.add_argument(
+        "--sink-roll-minutes",
+        type=float,
+        default=DEFAULT_ROLL_MINUTES,
+        help=f"Start a new SRT/WebVTT/JSONL file every N minutes (0 = never). Default: {DEFAULT_ROLL_MINUTES:g}",
+    )
+    parser.add_argument(
+        "--log-level",
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        default="INFO",
+        help="Log level. DEBUG also logs per-segment audio statistics. Default: INFO",
+    )
+    parser.add_argument(
+        "--log-file",
+        default=None,
+        help="Also write logs to this file (rotated at 10 MB, 5 backups)",
+    )
+    parser.add_argument(
+        "--log-format",
+        choices=["text", "json"],
+        default="text",
+        help="Log line format: text or json (one object per line). Default: text",
+    )
+    parser.add_argument(
+        "--no-browser",
+        action="store_true",
+        help="Do not open the settings page in a browser on startup (for headless / soak runs)",
+    )
     return parser.parse_args()
 
 
 def main() -> None:
     args = parse_args()
+    setup_logging(args.log_level, log_file=args.log_file, log_format=args.log_format)
+    if args.mt_memory_mb is not None:
+        translator_pool.set_budget(args.mt_memory_mb)
+    try:
+        output_sinks.configure(
+            args.sink or [],
+            queue_size=args.sink_queue_size,
+            roll_minutes=args.sink_roll_minutes,
+        )
+    except (ValueError, OSError) as exc:
+        shutdown_logging()
+        raise SystemExit(f"--sink: {exc}")
 
     # Open default browser to the settings page shortly after startup.
     url = f"http://{args.host}:{args.port}/settings"
@@ -457,10 +1156,31 @@ def main() -> None:
         except Exception:  # noqa: BLE001
             pass
 
-    threading.Timer(1.0, _open_browser).start()
+    if not args.no_browser:
+        threading.Timer(1.0, _open_browser).start()
 
-    # Debug=False でできるだけ軽く。
-    app.run(host=args.host, port=args.port, debug=False, threaded=True)
+    try:
+        if args.serve:
+            from server import serve
+
+            serve(
+                app,
+                transcript_buffer,
+                stop_worker,
+                host=args.host,
+                port=args.port,
+                threads=args.serve_threads,
+                max_connections=args.max_connections,
+                max_streams=args.max_streams,
+                graceful_timeout=args.graceful_timeout,
+                heartbeat_seconds=SSE_HEARTBEAT_SECONDS,
+            )
+        else:
+            # Debug=False でできるだけ軽く。
+            app.run(host=args.host, port=args.port, debug=False, threaded=True)
+    finally:
+        output_sinks.close()
+        shutdown_logging()
 
 
 if __name__ == "__main__":
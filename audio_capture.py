@@ -1,16 +1,33 @@
 import os
 import sys
+import random
 import shutil
 import subprocess
+import threading
+import time
+import wave
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional
 
 import numpy as np
 import sounddevice as sd
 
+from log_setup import get_logger
+
 
 DEFAULT_SAMPLE_RATE = 16000
 
+# Extra time an SRT read may take beyond its audio length (connect, buffer)
+# before the ffmpeg process is killed.
+SRT_CONNECT_TIMEOUT = 15.0
+# Decoded replay files kept in memory: the one playing plus one being
+# warmed up for a capture switch.
+MAX_REPLAY_SOURCES = 2
+
+srt_log = get_logger("srt")
+replay_log = get_logger("replay")
+
 
 def _resolve_ffmpeg_binary() -> str:
     env_value = os.environ.get("MST_FFMPEG")
@@ -39,12 +56,286 @@ def _resolve_ffmpeg_binary() -> str:
     return "ffmpeg"
 
 
+_child_procs: set[subprocess.Popen] = set()
+_child_procs_lock = threading.Lock()
+
+
+def _run_ffmpeg(
+    cmd: list[str],
+    timeout: float,
+    cancel_event: Optional[threading.Event] = None,
+) -> Optional[tuple[int, bytes, bytes]]:
+    """Run ffmpeg, killing it on timeout or when cancel_event is set.
+
+    Returns (returncode, stdout, stderr), or None when cancelled. The child
+    is tracked so kill_child_processes() can reap it from another thread.
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    with _child_procs_lock:
+        _child_procs.add(proc)
+    deadline = time.monotonic() + timeout
+    try:
+        while True:
+            try:
+                stdout, stderr = proc.communicate(timeout=0.1)
+                return proc.returncode, stdout or b"", stderr or b""
+            except subprocess.TimeoutExpired:
+                pass
+            if cancel_event is not None and cancel_event.is_set():
+                return None
+            if time.monotonic() > deadline:
+                proc.kill()
+                stdout, stderr = proc.communicate()
+                return -9, b"", (stderr or b"") + b"\n<killed: timeout>"
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+            proc.wait()
+        with _child_procs_lock:
+            _child_procs.discard(proc)
+
+
+def kill_child_processes() -> int:
+    """Kill every ffmpeg capture process still running; returns how many."""
+    with _child_procs_lock:
+        procs = list(_child_procs)
+    killed = 0
+    for proc in procs:
+        if proc.poll() is None:
+            proc.kill()
+            killed += 1
+    return killed
+
+
+def _wait_recording(cancel_event: Optional[threading.Event]) -> bool:
+    """sd.wait() that stops the stream early on cancel; False if cancelled."""
+    if cancel_event is None:
+        sd.wait()
+        return True
+    stream = sd.get_stream()
+    while stream.active:
+        if cancel_event.wait(0.05):
+            sd.stop()
+            return False
+    return True
+
+
+def _load_replay_audio(path: str, samplerate: int) -> np.ndarray:
+    """Load a media file as mono float32 PCM at ``samplerate``.
+
+    16-bit PCM WAV files whose sample rate already matches are read with the
+    standard library; everything else (other rates, mp3/mp4/mkv, ...) is
+    decoded through ffmpeg.
+    """
+    try:
+        with wave.open(path, "rb") as wf:
+            if wf.getsampwidth() == 2 and wf.getframerate() == samplerate:
+                channels = wf.getnchannels()
+                raw = wf.readframes(wf.getnframes())
+                pcm = np.frombuffer(raw, dtype=np.int16).astype("float32") / 32768.0
+                if channels > 1:
+                    pcm = pcm.reshape(-1, channels).mean(axis=1).astype("float32", copy=False)
+                return pcm
+    except (wave.Error, EOFError):
+        # Not a plain PCM WAV; let ffmpeg handle it below.
+        pass
+
+    ffmpeg_bin = _resolve_ffmpeg_binary()
+    proc = subprocess.run(
+        [
+            ffmpeg_bin,
+            "-loglevel",
+            "error",
+            "-i",
+            path,
+            "-vn",
+            "-acodec",
+            "pcm_s16le",
+            "-ac",
+            "1",
+            "-ar",
+            str(samplerate),
+            "-f",
+            "s16le",
+            "pipe:1",
+        ],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        check=False,
+    )
+    if proc.returncode != 0 or not proc.stdout:
+        stderr_txt = (proc.stderr or b"").decode(errors="ignore")[:500]
+        raise RuntimeError(f"ffmpeg could not decode {path!r}: {stderr_txt!r}")
+    return np.frombuffer(proc.stdout, dtype=np.int16).astype("float32") / 32768.0
+
+
+class _ReplaySource:
+    """Play a decoded media file back as if it were a live capture device.
+
+    The playback position follows the wall clock, so audio that "plays" while
+    the caller is busy (e.g. during inference) is skipped exactly like with
+    ``sd.rec`` or an SRT feed. Playback starts at the first read after
+    loading or ``reset()``.
+    """
+
+    def __init__(self, path: str, samplerate: int) -> None:
+        self.path = path
+        self.samplerate = samplerate
+        self.audio = _load_replay_audio(path, samplerate)
+        self.started_at: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def reset(self) -> None:
+        """Rewind to the start of the file on the next read (PCM stays loaded)."""
+        with self.lock:
+            self.started_at = None
+
+    def read(
+        self,
+        seconds: float,
+        loop: bool,
+        jitter: float,
+        cancel_event: Optional[threading.Event] = None,
+    ) -> np.ndarray:
+        frames = int(seconds * self.samplerate)
+        with self.lock:
+            if self.started_at is None:
+                self.started_at = time.monotonic()
+        delay = seconds
+        if jitter > 0:
+            delay += random.uniform(0.0, jitter)
+        if cancel_event is not None:
+            if cancel_event.wait(delay):
+                return np.zeros(0, dtype="float32")
+        else:
+            time.sleep(delay)
+
+        total = self.audio.size
+        if total == 0 or frames <= 0:
+            return np.zeros(0, dtype="float32")
+
+        with self.lock:
+            end = int((time.monotonic() - self.started_at) * self.samplerate)
+        start = end - frames
+        if not loop:
+            if start >= total:
+                return np.zeros(0, dtype="float32")
+            block = self.audio[max(0, start) : min(end, total)]
+            if block.size < frames:
+                block = np.concatenate([block, np.zeros(frames - block.size, dtype="float32")])
+            return block
+
+        idx = np.arange(start, end) % total
+        return self.audio[idx]
+
+
+_replay_sources: "OrderedDict[tuple[str, int], _ReplaySource]" = OrderedDict()
+_replay_lock = threading.Lock()
+
+
+def _get_replay_source(path: str, samplerate: int) -> _ReplaySource:
+    key = (os.path.abspath(path), samplerate)
+    with _replay_lock:
+        source = _replay_sources.get(key)
+        if source is None:
+            replay_log.info("loading %r at %d Hz", path, samplerate)
+            source = _ReplaySource(path, samplerate)
+            _replay_sources[key] = source
+            while len(_replay_sources) > MAX_REPLAY_SOURCES:
+                _replay_sources.popitem(last=False)
+        else:
+            _replay_sources.move_to_end(key)
+        return source
+
+
+def reset_replay_sources(path: Optional[str] = None) -> None:
+    """Rewind cached replay files (all, or only ``path``) to their start."""
+    with _replay_lock:
+        sources = list(_replay_sources.items())
+    for (source_path, _), source in sources:
+        if path is None or source_path == os.path.abspath(path):
+            source.reset()
+
+
+def release_replay_sources() -> None:
+    """Drop the decoded replay files (e.g. when the worker stops)."""
+    with _replay_lock:
+        _replay_sources.clear()
+
+
+def warm_capture_source(
+    capture_mode: str,
+    samplerate: int = DEFAULT_SAMPLE_RATE,
+    device: Optional[int] = None,
+    srt_url: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+) -> None:
+    """Open a capture source once so switching to it does not stall.
+
+    Replay files are decoded into the cache, SRT URLs are connected and
+    read for a moment, and sounddevice devices are checked for the
+    requested format. Raises if the source is not usable.
+    """
+    if capture_mode == "replay":
+        if not replay_path:
+            raise ValueError("replay_path is required for capture_mode 'replay'")
+        _get_replay_source(replay_path, samplerate)
+        return
+
+    if capture_mode == "srt":
+        if not srt_url:
+            raise ValueError("srt_url is required for capture_mode 'srt'")
+        result = _run_ffmpeg(
+            [
+                _resolve_ffmpeg_binary(),
+                "-loglevel",
+                "error",
+                "-i",
+                srt_url,
+                "-vn",
+                "-ac",
+                "1",
+                "-ar",
+                str(samplerate),
+                "-t",
+                "0.5",
+                "-f",
+                "s16le",
+                "pipe:1",
+            ],
+            timeout=SRT_CONNECT_TIMEOUT,
+            cancel_event=cancel_event,
+        )
+        if result is None:
+            return
+        returncode, audio_bytes, stderr_bytes = result
+        if returncode != 0 or not audio_bytes:
+            raise RuntimeError(
+                f"could not read from {srt_url!r}: {stderr_bytes.decode(errors='ignore')[:300]!r}",
+            )
+        return
+
+    if capture_mode == "loopback":
+        # Loopback falls back to input capture in record_block, so only
+        # make sure the device exists.
+        if device is not None:
+            sd.query_devices(device)
+        return
+
+    sd.check_input_settings(device=device, channels=1, dtype="float32", samplerate=samplerate)
+
+
 def record_block(
     seconds: float,
     samplerate: int = DEFAULT_SAMPLE_RATE,
     device: Optional[int] = None,
     capture_mode: str = "input",
     srt_url: Optional[str] = None,
+    replay_path: Optional[str] = None,
+    replay_loop: bool = True,
+    replay_jitter: float = 0.0,
+    cancel_event: Optional[threading.Event] = None,
 ) -> np.ndarray:
     """Record a mono audio block from the given input or loopback device.
 
@@ -64,18 +355,41 @@ def record_block(
         "loopback" -> capture system playback using WASAPI loopback when
                       available (Windows only). Falls back to input capture
                       if loopback is not available.
+        "srt"     -> pull audio from srt_url through ffmpeg.
+        "replay"  -> play replay_path (WAV or anything ffmpeg can decode)
+                     at real-time pace, for testing without audio hardware.
+    replay_loop: bool
+        Restart from the beginning when the replay file ends.
+    replay_jitter: float
+        Maximum random extra delay in seconds added to each replay block,
+        to simulate uneven capture timing.
+    cancel_event: Optional[threading.Event]
+        When set, the recording is stopped (ffmpeg killed, sounddevice
+        stream stopped) and an empty array is returned.
     """
     frames = int(seconds * samplerate)
 
+    if capture_mode == "replay":
+        if not replay_path:
+            replay_log.error("capture_mode='replay' ですが replay_path が指定されていません。")
+            return np.zeros(0, dtype="float32")
+        try:
+            source = _get_replay_source(replay_path, samplerate)
+        except Exception as exc:  # noqa: BLE001
+            replay_log.error("再生ファイルを読み込めませんでした: %r (%r)", replay_path, exc)
+            time.sleep(seconds)
+            return np.zeros(0, dtype="float32")
+        return source.read(seconds, loop=replay_loop, jitter=replay_jitter, cancel_event=cancel_event)
+
     if capture_mode == "srt":
         if not srt_url:
-            print("[srt] capture_mode='srt' ですが srt_url が指定されていません。")
+            srt_log.error("capture_mode='srt' ですが srt_url が指定されていません。")
             return np.zeros(0, dtype="float32")
         ffmpeg_bin = _resolve_ffmpeg_binary()
         audio_bytes = b""
         for attempt in range(3):
             try:
-                proc = subprocess.run(
+                result = _run_ffmpeg(
                     [
                         ffmpeg_bin,
                         "-loglevel",
@@ -95,36 +409,39 @@ def record_block(
                         "s16le",
                         "pipe:1",
                     ],
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    check=False,
+                    timeout=seconds + SRT_CONNECT_TIMEOUT,
+                    cancel_event=cancel_event,
                 )
             except FileNotFoundError as exc:
-                print(f"[srt] ffmpeg バイナリが見つかりませんでした: {ffmpeg_bin!r} ({exc!r})")
+                srt_log.error("ffmpeg バイナリが見つかりませんでした: %r (%r)", ffmpeg_bin, exc)
                 return np.zeros(0, dtype="float32")
             except Exception as exc:
-                print(f"[srt] ffmpeg 実行中に予期しない例外が発生しました (attempt={attempt + 1}): {exc!r}")
+                srt_log.warning("ffmpeg 実行中に予期しない例外が発生しました (attempt=%d): %r", attempt + 1, exc)
                 continue
-            audio_bytes = proc.stdout or b""
-            if proc.returncode != 0 or not audio_bytes:
+            if result is None:
+                return np.zeros(0, dtype="float32")
+            returncode, audio_bytes, stderr_bytes = result
+            if returncode != 0 or not audio_bytes:
                 stderr_txt = ""
-                if proc.stderr:
+                if stderr_bytes:
                     try:
-                        stderr_txt = proc.stderr.decode(errors="ignore")
+                        stderr_txt = stderr_bytes.decode(errors="ignore")
                     except Exception:
                         stderr_txt = "<stderr decode failed>"
                     if len(stderr_txt) > 500:
                         stderr_txt = stderr_txt[:500] + "..."
-                print(
-                    f"[srt] ffmpeg 実行に失敗しました (attempt={attempt + 1}, returncode={proc.returncode}). "
-                    f"stderr={stderr_txt!r}"
+                srt_log.warning(
+                    "ffmpeg 実行に失敗しました (attempt=%d, returncode=%s). stderr=%r",
+                    attempt + 1,
+                    returncode,
+                    stderr_txt,
                 )
                 audio_bytes = b""
                 continue
             break
 
         if not audio_bytes:
-            print("[srt] 複数回リトライしましたが、SRT から音声データを取得できませんでした。")
+            srt_log.error("複数回リトライしましたが、SRT から音声データを取得できませんでした。")
             return np.zeros(0, dtype="float32")
         audio = np.frombuffer(audio_bytes, dtype=np.int16).astype("float32") / 32768.0
         if audio.size == 0:
@@ -169,7 +486,8 @@ def record_block(
                 device=output_device,
                 extra_settings=extra_settings,  # type: ignore[arg-type]
             )
-            sd.wait()
+            if not _wait_recording(cancel_event):
+                return np.zeros(0, dtype="float32")
             if audio.ndim == 2 and audio.shape[1] > 1:
                 audio_mono = audio.mean(axis=1).astype("float32", copy=False)
             else:
@@ -186,5 +504,6 @@ def record_block(
         dtype="float32",
         device=device,
     )
-    sd.wait()
+    if not _wait_recording(cancel_event):
+        return np.zeros(0, dtype="float32")
     return audio.reshape(-1)
@@ -0,0 +1,305 @@
+"""Benchmark CTranslate2 compute types and thread counts on this machine.
+
+For both the Whisper ASR model and the Sugoi ja→en translator this:
+
+1. runs a high-precision baseline (float32 on CPU, float16 on CUDA),
+2. tries each supported compute type (int8, int8_float32, int16, float32,
+   plus the float16 variants on CUDA) with default threading,
+3. sweeps thread splits for the fastest compute type that stays within the
+   accuracy tolerance,
+
+and writes the winner to the per-machine profile read by
+``stt_translate.create_model`` / ``TranslatorPool``
+(``<venv>/models/autotune_profile.json``). The translator is always tuned
+on ``stt_translate.TRANSLATOR_DEVICE`` (CPU), the device it runs on, so
+``--device`` only selects the Whisper device.
+
+Accuracy is the character error rate (Whisper) or word error rate
+(translator) against ``--reference-text`` when given, otherwise against the
+baseline's own output.
+
+Example:
+
+    python autotune.py --clip reference_ja.wav --reference-text reference_ja.txt
+"""
+
+import argparse
+import datetime
+import gc
+import json
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+import ctranslate2
+from faster_whisper import WhisperModel
+
+from audio_capture import DEFAULT_SAMPLE_RATE, _load_replay_audio
+from log_setup import setup_logging, shutdown_logging
+import stt_translate
+
+
+CPU_COMPUTE_TYPES = ["int8", "int8_float32", "int16", "float32"]
+CUDA_COMPUTE_TYPES = ["int8_float16", "float16", "int8_float32", "float32"]
+
+
+
+def _edit_distance(a: list[str], b: list[str]) -> int:
+    prev = list(range(len(b) + 1))
+    for i, x in enumerate(a, 1):
+        cur = [i] + [0] * len(b)
+        for j, y in enumerate(b, 1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (x != y))
+        prev = cur
+    return prev[-1]
+
+
+def char_error_rate(hyp: str, ref: str) -> float:
+    """CER ignoring whitespace and punctuation (suits Japanese text)."""
+    clean = lambda t: [c for c in t if c.isalnum()]  # noqa: E731
+    ref_chars = clean(ref)
+    if not ref_chars:
+        return 0.0 if not clean(hyp) else 1.0
+    return _edit_distance(clean(hyp), ref_chars) / len(ref_chars)
+
+
+def word_error_rate(hyp: str, ref: str) -> float:
+    words = lambda t: re.findall(r"\w+", t.lower())  # noqa: E731
+    ref_words = words(ref)
+    if not ref_words:
+        return 0.0 if not words(hyp) else 1.0
+    return _edit_distance(words(hyp), ref_words) / len(ref_words)
+
+
+def _time_runs(fn: Callable[[], str], repeats: int) -> tuple[float, str]:
+    """Warm up once, then return (median seconds, last output)."""
+    output = fn()
+    times = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        output = fn()
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times), output
+
+
+def _thread_candidates() -> list[int]:
+    n = os.cpu_count() or 1
+    return sorted({0, n, max(1, n // 2), max(1, n // 4)})
+
+
+def _compute_types(device: str) -> tuple[list[str], str]:
+    """(candidate compute types, baseline type) supported on ``device``."""
+    supported = set(ctranslate2.get_supported_compute_types(device))
+    candidates = CUDA_COMPUTE_TYPES if device == "cuda" else CPU_COMPUTE_TYPES
+    baseline = "float16" if device == "cuda" and "float16" in supported else "float32"
+    return [c for c in candidates if c in supported], baseline
+
+
+class Tuner:
+    def __init__(self, args: argparse.Namespace, audio, reference_text: Optional[str]) -> None:
+        self.args = args
+        self.audio = audio
+        self.reference_text = reference_text
+        self.device = args.device
+        self.compute_types, self.baseline_type = _compute_types(self.device)
+        self.mt_device = stt_translate.TRANSLATOR_DEVICE
+        self.mt_compute_types, self.mt_baseline_type = _compute_types(self.mt_device)
+
+    # -- Whisper ------------------------------------------------------------
+
+    def _run_whisper(self, settings: dict) -> tuple[float, str]:
+        model = WhisperModel(
+            stt_translate.resolve_whisper_model(self.args.model_id),
+            device=self.device,
+            **settings,
+        )
+        try:
+            return _time_runs(
+                lambda: stt_translate.translate_segment(
+                    model,
+                    self.audio,
+                    sample_rate=DEFAULT_SAMPLE_RATE,
+                    mode="transcribe",
+                    quality=self.args.quality,
+                ),
+                self.args.repeats,
+            )
+        finally:
+            del model
+            gc.collect()
+
+    def tune_whisper(self) -> tuple[dict, str]:
+        base = {"compute_type": self.baseline_type, "cpu_threads": 0, "num_workers": 1}
+        print(f"[autotune] whisper baseline {base} ...")
+        base_time, base_text = self._run_whisper(base)
+        reference = self.reference_text or base_text
+        base_err = char_error_rate(base_text, reference)
+        print(f"[autotune]   {base_time:.3f}s cer={base_err:.3f} text={base_text!r}")
+        limit = base_err + self.args.tolerance
+
+        best = dict(base, seconds=base_time, error=base_err)
+        for compute_type in self.compute_types:
+            if compute_type == self.baseline_type:
+                continue
+            settings = dict(base, compute_type=compute_type)
+            best = self._try_whisper(settings, reference, limit, best)
+
+        if self.device == "cpu":
+            for threads in _thread_candidates():
+                if threads == best["cpu_threads"]:
+                    continue
+                settings = {"compute_type": best["compute_type"], "cpu_threads": threads, "num_workers": 1}
+                best = self._try_whisper(settings, reference, limit, best)
+        return best, base_text
+
+    def _try_whisper(self, settings: dict, reference: str, limit: float, best: dict) -> dict:
+        print(f"[autotune] whisper {settings} ...")
+        try:
+            seconds, text = self._run_whisper(settings)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[autotune]   failed: {exc!r}")
+            return best
+        err = char_error_rate(text, reference)
+        ok = err <= limit
+        print(f"[autotune]   {seconds:.3f}s cer={err:.3f} {'ok' if ok else 'over tolerance'}")
+        if ok and seconds < best["seconds"]:
+            return dict(settings, seconds=seconds, error=err)
+        return best
+
+    # -- translator ---------------------------------------------------------
+
+    def _run_translator(self, settings: dict, text: str) -> tuple[float, str]:
+        spec = stt_translate.translator_spec("ja", "en")
+        base_dir = stt_translate._ensure_translator_dir(spec)
+        sp_src, sp_tgt = stt_translate._load_sentencepiece(base_dir, spec)
+        translator = ctranslate2.Translator(str(base_dir), device=self.mt_device, **settings)
+        try:
+            return _time_runs(
+                lambda: stt_translate._translate_with(translator, sp_src, sp_tgt, text),
+                self.args.repeats,
+            )
+        finally:
+            del translator
+            gc.collect()
+
+    def tune_translator(self, ja_text: str) -> dict:
+        base = {"compute_type": self.mt_baseline_type, "inter_threads": 1, "intra_threads": 0}
+        print(f"[autotune] translator baseline {base} ...")
+        base_time, reference = self._run_translator(base, ja_text)
+        print(f"[autotune]   {base_time:.3f}s text={reference!r}")
+        limit = self.args.mt_tolerance
+
+        best = dict(base, seconds=base_time, error=0.0)
+        for compute_type in self.mt_compute_types:
+            if compute_type == self.mt_baseline_type:
+                continue
+            best = self._try_translator(dict(base, compute_type=compute_type), ja_text, reference, limit, best)
+
+        if self.mt_device == "cpu":
+            n = os.cpu_count() or 1
+            splits = {(1, t) for t in _thread_candidates()} | {(2, max(1, n // 2))}
+            for inter, intra in sorted(splits):
+                if (inter, intra) == (best["inter_threads"], best["intra_threads"]):
+                    continue
+                settings = {"compute_type": best["compute_type"], "inter_threads": inter, "intra_threads": intra}
+                best = self._try_translator(settings, ja_text, reference, limit, best)
+        return best
+
+    def _try_translator(self, settings: dict, ja_text: str, reference: str, limit: float, best: dict) -> dict:
+        print(f"[autotune] translator {settings} ...")
+        try:
+            seconds, text = self._run_translator(settings, ja_text)
+        except Exception as exc:  # noqa: BLE001
+            print(f"[autotune]   failed: {exc!r}")
+            return best
+        err = word_error_rate(text, reference)
+        ok = err <= limit
+        print(f"[autotune]   {seconds:.3f}s wer={err:.3f} {'ok' if ok else 'over tolerance'}")
+        if ok and seconds < best["seconds"]:
+            return dict(settings, seconds=seconds, error=err)
+        return best
+
+
+def save_profile(device: str, model_id: str, whisper: Optional[dict], translator: Optional[dict]) -> Path:
+    path = stt_translate.TUNING_PROFILE_PATH
+    profile = stt_translate.load_tuning_profile() or {}
+    profile["fingerprint"] = stt_translate.machine_fingerprint()
+    profile["updated"] = datetime.datetime.now().isoformat(timespec="seconds")
+    if whisper is not None:
+        profile.setdefault("whisper", {}).setdefault(device, {})[model_id] = whisper
+    if translator is not None:
+        profile.setdefault("translator", {})[stt_translate.TRANSLATOR_DEVICE] = translator
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(profile, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Autotune CTranslate2 compute_type / threads for this machine")
+    parser.add_argument(
+        "--clip",
+        required=True,
+        help="Reference speech clip: a short (10-30 s) Japanese recording, WAV or anything ffmpeg decodes",
+    )
+    parser.add_argument("--reference-text", default=None, help="File with the correct transcript of the clip")
+    parser.add_argument("--device", choices=["cpu", "cuda"], default="cpu")
+    parser.add_argument(
+        "--model-id",
+        default=None,
+        help="Whisper checkpoint to tune. Default: the checkpoint of the --quality preset",
+    )
+    parser.add_argument("--quality", default="normal", help="Decoding preset used while timing. Default: normal")
+    parser.add_argument("--repeats", type=int, default=3, help="Timed runs per candidate (after one warm-up)")
+    parser.add_argument("--tolerance", type=float, default=0.02, help="Allowed extra CER over baseline (Whisper)")
+    parser.add_argument("--mt-tolerance", type=float, default=0.15, help="Allowed WER vs. baseline (translator)")
+    parser.add_argument("--skip-whisper", action="store_true")
+    parser.add_argument("--skip-translator", action="store_true")
+    parser.add_argument("--dry-run", action="store_true", help="Print the result without saving the profile")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    if not args.model_id:
+        args.model_id = stt_translate.quality_preset(args.quality)["model_id"]
+    setup_logging("WARNING")
+    try:
+        if not os.path.exists(args.clip):
+            raise SystemExit(
+                f"reference clip not found: {args.clip}\n"
+                "Record a short Japanese speech sample (10-30 s) and pass it with --clip.",
+            )
+        audio = _load_replay_audio(args.clip, DEFAULT_SAMPLE_RATE)
+        reference_text = None
+        if args.reference_text:
+            reference_text = Path(args.reference_text).read_text(encoding="utf-8").strip()
+        print(f"[autotune] clip={args.clip!r} ({audio.size / DEFAULT_SAMPLE_RATE:.1f}s) device={args.device!r}")
+
+        tuner = Tuner(args, audio, reference_text)
+        whisper_best = None
+        ja_text = reference_text or ""
+        if not args.skip_whisper:
+            whisper_best, base_text = tuner.tune_whisper()
+            ja_text = ja_text or base_text
+            print(f"[autotune] whisper best: {whisper_best}")
+        translator_best = None
+        if not args.skip_translator:
+            if not ja_text:
+                raise SystemExit("translator tuning needs --reference-text or a Whisper run")
+            translator_best = tuner.tune_translator(ja_text)
+            print(f"[autotune] translator best: {translator_best}")
+
+        if args.dry_run:
+            return
+        path = save_profile(args.device, args.model_id, whisper_best, translator_best)
+        print(f"[autotune] wrote {path}")
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Queue-backed logging so the audio / inference threads never block on I/O.
+
+Callers on the hot path only build a LogRecord and push it onto a bounded
+queue. A single background QueueListener thread formats the records and
+writes them to the console and, optionally, a rotating log file.
+
+Usage:
+
+    from log_setup import get_logger
+    log = get_logger("worker")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("captured %d samples, max=%.4f", audio.size, float(audio.max()))
+
+``setup_logging()`` is called once from ``main()``. Until then loggers fall
+back to Python's default last-resort handler (warnings and above to stderr).
+"""
+
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Optional
+
+
+LOG_QUEUE_SIZE = 10000
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_queue_handler: Optional["_NonBlockingQueueHandler"] = None
+_setup_lock = threading.Lock()
+
+
+class _NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers formatting and never blocks the caller.
+
+    The stock QueueHandler.prepare() formats the message in the calling
+    thread; here the record is enqueued untouched and all formatting happens
+    on the listener thread. When the queue is full the record is dropped and
+    counted rather than stalling audio capture.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg (+ exc)."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "thread": record.threadName,
+            "msg": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, ensure_ascii=False)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Return the application logger for a component (e.g. "worker", "srt")."""
+    return logging.getLogger(f"mst.{name}")
+
+
+def setup_logging(
+    level: str = "INFO",
+    log_file: Optional[str] = None,
+    log_format: str = "text",
+    max_bytes: int = 10 * 1024 * 1024,
+    backup_count: int = 5,
+) -> None:
+    """Install the queue handler on the root logger and start the writer thread.
+
+    Calling this again replaces the previous configuration.
+    """
+    global _listener, _queue_handler
+
+    if log_format == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s %(levelname)-7s [%(name)s] %(message)s",
+            datefmt="%H:%M:%S",
+        )
+
+    handlers: list[logging.Handler] = []
+    console = logging.StreamHandler(sys.stdout)
+    console.setFormatter(formatter)
+    handlers.append(console)
+    if log_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file,
+            maxBytes=max_bytes,
+            backupCount=backup_count,
+            encoding="utf-8",
+        )
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    with _setup_lock:
+        shutdown_logging()
+
+        log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _queue_handler = _NonBlockingQueueHandler(log_queue)
+        root = logging.getLogger()
+        root.addHandler(_queue_handler)
+        root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush pending records and stop the writer thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+
+
+def dropped_records() -> int:
+    """Number of records dropped because the log queue was full."""
+    return _queue_handler.dropped if _queue_handler is not None else 0
@@ -0,0 +1,259 @@
+"""Production serving mode (``app.py --serve``).
+
+Runs the Flask app under uvicorn's asyncio event loop instead of Werkzeug's
+development server:
+
+- Ordinary routes run through a2wsgi's ``WSGIMiddleware`` on a bounded
+  thread pool, so dozens of polling OBS/browser sources share a fixed
+  number of threads instead of one thread per connection. Responses are
+  streamed with back-pressure, not buffered.
+- ``/transcript/stream`` (Server-Sent Events) is answered natively on the
+  event loop. An idle stream costs one asyncio task, not one thread.
+- Ctrl+C / SIGTERM closes open streams, lets in-flight requests finish
+  (up to ``graceful_timeout``) and then stops the audio worker.
+
+uvicorn and a2wsgi are optional (``pip install uvicorn a2wsgi``) and imported
+lazily, so the default dev-server path does not need them.
+Only a single server process is supported: the worker thread and transcript
+buffer live in-process, so multiple uvicorn worker processes would each
+capture audio on their own.
+"""
+
+import asyncio
+import json
+from typing import Any, Callable, Optional
+
+from log_setup import get_logger
+
+
+log = get_logger("server")
+
+STREAM_PATH = "/transcript/stream"
+
+
+class _StreamHub:
+    """Fan transcript updates out to the connected SSE clients."""
+
+    def __init__(self, max_streams: int) -> None:
+        self.max_streams = max_streams
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.version = 0
+        self.text = ""
+        self.closed = False
+        self._subscribers: set[asyncio.Queue] = set()
+
+    def bind(self, loop: asyncio.AbstractEventLoop, version: int, text: str) -> None:
+        self.loop = loop
+        self.version = version
+        self.text = text
+
+    def on_change(self, version: int, text: str) -> None:
+        # Called from the worker thread; only hop onto the loop.
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._publish, version, text)
+
+    def close(self) -> None:
+        loop = self.loop
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._close)
+
+    def subscribe(self) -> Optional[asyncio.Queue]:
+        if self.closed or len(self._subscribers) >= self.max_streams:
+            return None
+        q: asyncio.Queue = asyncio.Queue(maxsize=1)
+        self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q: asyncio.Queue) -> None:
+        self._subscribers.discard(q)
+
+    def _publish(self, version: int, text: str) -> None:
+        if version <= self.version:
+            return
+        self.version = version
+        self.text = text
+        for q in self._subscribers:
+            # Slow clients only ever need the latest text; replace any
+            # pending update instead of queueing a backlog.
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(text)
+
+    def _close(self) -> None:
+        self.closed = True
+        for q in self._subscribers:
+            if q.full():
+                q.get_nowait()
+            q.put_nowait(None)
+
+
+def _sse_event(text: str) -> bytes:
+    return f"data: {json.dumps({'text': text})}\n\n".encode("utf-8")
+
+
+class AsgiApp:
+    """ASGI application: native SSE + lifespan, everything else via ``wsgi_asgi``.
+
+    ``wsgi_asgi`` is the Flask app already wrapped for ASGI (a2wsgi).
+    """
+
+    def __init__(
+        self,
+        wsgi_asgi: Callable,
+        transcript_buffer: Any,
+        on_shutdown: Callable[[], None],
+        max_streams: int,
+        heartbeat_seconds: float,
+    ) -> None:
+        self.wsgi_asgi = wsgi_asgi
+        self.transcript_buffer = transcript_buffer
+        self.on_shutdown = on_shutdown
+        self.heartbeat_seconds = heartbeat_seconds
+        self.hub = _StreamHub(max_streams)
+
+    async def __call__(self, scope: dict, receive: Callable, send: Callable) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            if scope["path"] == STREAM_PATH and scope["method"] == "GET":
+                await self._stream(scope, receive, send)
+            else:
+                await self.wsgi_asgi(scope, receive, send)
+
+    # -- lifespan ---------------------------------------------------------
+
+    async def _lifespan(self, receive: Callable, send: Callable) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                version, text = self.transcript_buffer.snapshot()
+                self.hub.bind(asyncio.get_running_loop(), version, text)
+                self.transcript_buffer.add_listener(self.hub.on_change)
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.transcript_buffer.remove_listener(self.hub.on_change)
+                log.info("stopping worker ...")
+                loop = asyncio.get_running_loop()
+                try:
+                    await loop.run_in_executor(None, self.on_shutdown)
+                except Exception as exc:  # noqa: BLE001
+                    log.error("worker shutdown failed: %r", exc)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    # -- SSE --------------------------------------------------------------
+
+    async def _stream(self, scope: dict, receive: Callable, send: Callable) -> None:
+        q = self.hub.subscribe()
+        if q is None:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 503,
+                    "headers": [(b"content-type", b"text/plain"), (b"retry-after", b"5")],
+                }
+            )
+            await send({"type": "http.response.body", "body": b"too many streams"})
+            return
+
+        async def _wait_disconnect() -> None:
+            while True:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+
+        disconnect = asyncio.ensure_future(_wait_disconnect())
+        try:
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": 200,
+                    "headers": [
+                        (b"content-type", b"text/event-stream; charset=utf-8"),
+                        (b"cache-control", b"no-store"),
+                        (b"x-accel-buffering", b"no"),
+                    ],
+                }
+            )
+            await send({"type": "http.response.body", "body": _sse_event(self.hub.text), "more_body": True})
+            while True:
+                update = asyncio.ensure_future(q.get())
+                done, _ = await asyncio.wait(
+                    {update, disconnect},
+                    timeout=self.heartbeat_seconds,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    update.cancel()
+                    return
+                if update not in done:
+                    update.cancel()
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+                    continue
+                text = update.result()
+                if text is None:
+                    break
+                await send({"type": "http.response.body", "body": _sse_event(text), "more_body": True})
+            await send({"type": "http.response.body", "body": b""})
+        except OSError:
+            # Client went away mid-write.
+            pass
+        finally:
+            disconnect.cancel()
+            self.hub.unsubscribe(q)
+
+
+def serve(
+    wsgi_app: Callable,
+    transcript_buffer: Any,
+    on_shutdown: Callable[[], None],
+    host: str = "127.0.0.1",
+    port: int = 5000,
+    threads: int = 16,
+    max_connections: int = 512,
+    max_streams: int = 256,
+    graceful_timeout: float = 10.0,
+    heartbeat_seconds: float = 15.0,
+) -> None:
+    """Run the app under uvicorn until interrupted."""
+    try:
+        import uvicorn  # type: ignore[import]
+        from a2wsgi import WSGIMiddleware  # type: ignore[import]
+    except ImportError as exc:
+        raise RuntimeError("--serve requires uvicorn and a2wsgi; install them with `pip install uvicorn a2wsgi`") from exc
+
+    asgi_app = AsgiApp(
+        WSGIMiddleware(wsgi_app, workers=threads),
+        transcript_buffer,
+        on_shutdown,
+        max_streams=max_streams,
+        heartbeat_seconds=heartbeat_seconds,
+    )
+
+    class _Server(uvicorn.Server):
+        def handle_exit(self, sig: int, frame: Any) -> None:
+            # End open SSE streams right away so graceful shutdown does not
+            # wait the full timeout on them.
+            asgi_app.hub.close()
+            super().handle_exit(sig, frame)
+
+    config = uvicorn.Config(
+        asgi_app,
+        host=host,
+        port=port,
+        lifespan="on",
+        limit_concurrency=max_connections,
+        timeout_graceful_shutdown=graceful_timeout,
+        access_log=False,
+        log_config=None,
+    )
+    log.info(
+        "serving on http://%s:%d (threads=%d max_connections=%d max_streams=%d)",
+        host,
+        port,
+        threads,
+        max_connections,
+        max_streams,
+    )
+    _Server(config).run()
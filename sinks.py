@@ -0,0 +1,419 @@
+"""Caption output sinks fed from the transcript pipeline.
+
+Besides the in-memory ``transcript_buffer`` the worker can publish every
+caption to any number of sinks:
+
+- ``srt:PATH`` / ``vtt:PATH``: rolling SubRip / WebVTT caption files,
+- ``jsonl:PATH``: one JSON object per caption,
+- ``udp://HOST:PORT``: one JSON datagram per caption,
+- ``tcp://HOST:PORT``: newline-delimited JSON over a client connection
+  (reconnected with backoff).
+
+The worker only calls ``OutputSinks.publish()``, which does a
+``put_nowait`` per sink. Each sink has its own bounded queue and writer
+thread; the writer drains whatever has queued up and writes it as one
+batch (one write + flush, one ``sendall``). When a queue is full the
+oldest caption is dropped and counted, so a slow disk or a dead socket
+never stalls inference.
+
+File sinks roll over to a new file every ``roll_minutes`` (0 = never); the
+first file uses PATH as given, later ones get a ``-YYYYmmdd-HHMMSS``
+suffix. SRT / WebVTT files are never overwritten: if PATH already exists
+(e.g. from a previous session) the first file gets the suffix as well. Each caption event is a dict with ``text``, ``start`` / ``end``
+(wall-clock seconds of the captured audio), ``mode`` and ``language``.
+"""
+
+import json
+import os
+import queue
+import socket
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlsplit
+
+from log_setup import get_logger
+
+
+log = get_logger("sinks")
+
+DEFAULT_QUEUE_SIZE = 256
+DEFAULT_ROLL_MINUTES = 60.0
+# Upper bound of captions written per batch.
+MAX_BATCH = 64
+TCP_RECONNECT_MAX_SECONDS = 30.0
+
+
+class Sink:
+    """Base class: bounded queue + writer thread. Subclasses implement write_batch()."""
+
+    def __init__(self, spec: str, queue_size: int = DEFAULT_QUEUE_SIZE) -> None:
+        self.spec = spec
+        self.queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._closing = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f"sink-{type(self).__name__}", daemon=True)
+        self._thread.start()
+
+    def submit(self, event: dict) -> None:
+        """Queue a caption without blocking; drops the oldest one when full."""
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def set_queue_size(self, queue_size: int) -> None:
+        """Resize the queue in place; a smaller queue drops the oldest captions on the next submit."""
+        with self.queue.mutex:
+            self.queue.maxsize = max(1, queue_size)
+
+    def set_roll_minutes(self, roll_minutes: float) -> None:
+        pass
+
+    def close(self, timeout: float = 2.0) -> None:
+        """Flush what is queued (up to timeout), then release the resource."""
+        self._closing.set()
+        self._thread.join(timeout=timeout)
+
+    def stats(self) -> dict:
+        return {
+            "spec": self.spec,
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
+
+    def write_batch(self, events: list[dict]) -> None:
+        raise NotImplementedError
+
+    def release(self) -> None:
+        pass
+
+    def _run(self) -> None:
+        try:
+            while True:
+                try:
+                    first = self.queue.get(timeout=0.2)
+                except queue.Empty:
+                    if self._closing.is_set():
+                        return
+                    continue
+                batch = [first]
+                while len(batch) < MAX_BATCH:
+                    try:
+                        batch.append(self.queue.get_nowait())
+                    except queue.Empty:
+                        break
+                try:
+                    self.write_batch(batch)
+                    self.written += len(batch)
+                except Exception as exc:  # noqa: BLE001
+                    self.errors += 1
+                    self.dropped += len(batch)
+                    if self.last_error != repr(exc):
+                        log.warning("sink %s failed: %r", self.spec, exc)
+                    self.last_error = repr(exc)
+        finally:
+            try:
+                self.release()
+            except Exception:  # noqa: BLE001
+                pass
+
+
+class _RollingFileSink(Sink):
+    suffix = ""
+    # Caption files restart their cue numbering, so they are rewritten;
+    # logs are appended to.
+    file_mode = "w"
+
+    def __init__(self, spec: str, path: str, queue_size: int, roll_minutes: float) -> None:
+        self.path = Path(path)
+        self.roll_seconds = max(0.0, roll_minutes) * 60.0
+        self._file = None
+        self._opened_at = 0.0
+        self._rolls = 0
+        # Open the first file now so a bad or unwritable path is rejected
+        # by create_sink() instead of failing later in the writer thread.
+        if self.path.is_dir():
+            raise IsADirectoryError(f"sink path {path!r} is a directory")
+        self._ensure_file(time.time())
+        super().__init__(spec, queue_size)
+
+    def set_roll_minutes(self, roll_minutes: float) -> None:
+        # Checked by the writer on every batch, so this applies to the open file.
+        self.roll_seconds = max(0.0, roll_minutes) * 60.0
+
+    def _current_path(self) -> Path:
+        overwrite = self.file_mode == "w"
+        if self._rolls == 0 and not (overwrite and self.path.exists()):
+            return self.path
+        stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(self._opened_at))
+        suffix = self.path.suffix or self.suffix
+        path = self.path.with_name(f"{self.path.stem}-{stamp}{suffix}")
+        n = 1
+        while overwrite and path.exists():
+            path = self.path.with_name(f"{self.path.stem}-{stamp}-{n}{suffix}")
+            n += 1
+        return path
+
+    def _ensure_file(self, now: float):
+        if self._file is not None and self.roll_seconds and now - self._opened_at >= self.roll_seconds:
+            self._file.close()
+            self._file = None
+            self._rolls += 1
+        if self._file is None:
+            self._opened_at = now
+            path = self._current_path()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(path, self.file_mode, encoding="utf-8", newline="\n")
+            self.start_file()
+        return self._file
+
+    def start_file(self) -> None:
+        pass
+
+    def format_event(self, event: dict) -> str:
+        raise NotImplementedError
+
+    def write_batch(self, events: list[dict]) -> None:
+        f = self._ensure_file(time.time())
+        f.write("".join(self.format_event(e) for e in events))
+        f.flush()
+
+    def release(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class _CaptionFileSink(_RollingFileSink):
+    """Shared cue timing for SRT / WebVTT: times are relative to the file start."""
+
+    def start_file(self) -> None:
+        self._index = 0
+        self._last_end = 0.0
+
+    def _cue_times(self, event: dict) -> tuple[float, float]:
+        start = max(event["start"] - self._opened_at, self._last_end, 0.0)
+        end = max(event["end"] - self._opened_at, start + 0.5)
+        self._last_end = end
+        self._index += 1
+        return start, end
+
+    @staticmethod
+    def _timestamp(seconds: float, sep: str) -> str:
+        ms = int(round(seconds * 1000))
+        h, ms = divmod(ms, 3600000)
+        m, ms = divmod(ms, 60000)
+        s, ms = divmod(ms, 1000)
+        return f"{h:02d}:{m:02d}:{s:02d}{sep}{ms:03d}"
+
+
+class SrtSink(_CaptionFileSink):
+    suffix = ".srt"
+
+    def format_event(self, event: dict) -> str:
+        start, end = self._cue_times(event)
+        return (
+            f"{self._index}\n"
+            f"{self._timestamp(start, ',')} --> {self._timestamp(end, ',')}\n"
+            f"{event['text']}\n\n"
+        )
+
+
+class VttSink(_CaptionFileSink):
+    suffix = ".vtt"
+
+    def start_file(self) -> None:
+        super().start_file()
+        self._file.write("WEBVTT\n\n")
+
+    def format_event(self, event: dict) -> str:
+        start, end = self._cue_times(event)
+        return f"{self._timestamp(start, '.')} --> {self._timestamp(end, '.')}\n{event['text']}\n\n"
+
+
+class JsonlSink(_RollingFileSink):
+    suffix = ".jsonl"
+    file_mode = "a"
+
+    def format_event(self, event: dict) -> str:
+        return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+class UdpSink(Sink):
+    def __init__(self, spec: str, host: str, port: int, queue_size: int) -> None:
+        self.address = (host, port)
+        self._sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_DGRAM)
+        super().__init__(spec, queue_size)
+
+    def write_batch(self, events: list[dict]) -> None:
+        # One datagram per caption so receivers never have to split packets.
+        for event in events:
+            self._sock.sendto(json.dumps(event, ensure_ascii=False).encode("utf-8"), self.address)
+
+    def release(self) -> None:
+        self._sock.close()
+
+
+class TcpSink(Sink):
+    def __init__(self, spec: str, host: str, port: int, queue_size: int) -> None:
+        self.address = (host, port)
+        self._sock: Optional[socket.socket] = None
+        self._retry_at = 0.0
+        self._backoff = 1.0
+        super().__init__(spec, queue_size)
+
+    def _connect(self) -> socket.socket:
+        if self._sock is not None:
+            return self._sock
+        now = time.monotonic()
+        if now < self._retry_at:
+            raise ConnectionError(f"{self.spec} unavailable, waiting to reconnect")
+        try:
+            self._sock = socket.create_connection(self.address, timeout=5.0)
+        except OSError:
+            self._retry_at = now + self._backoff
+            self._backoff = min(self._backoff * 2, TCP_RECONNECT_MAX_SECONDS)
+            raise
+        self._backoff = 1.0
+        log.info("sink %s connected", self.spec)
+        return self._sock
+
+    def write_batch(self, events: list[dict]) -> None:
+        sock = self._connect()
+        payload = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events).encode("utf-8")
+        try:
+            sock.sendall(payload)
+        except OSError:
+            self.release()
+            raise
+
+    def release(self) -> None:
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+
+def create_sink(
+    spec: str,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    roll_minutes: float = DEFAULT_ROLL_MINUTES,
+) -> Sink:
+    """Build a sink from a spec string (see module docstring). Raises ValueError."""
+    spec = spec.strip()
+    kind, sep, rest = spec.partition(":")
+    kind = kind.lower()
+    if not sep or not rest:
+        raise ValueError(
+            f"invalid sink {spec!r}; expected srt:PATH, vtt:PATH, jsonl:PATH, udp://HOST:PORT or tcp://HOST:PORT",
+        )
+    if kind in ("udp", "tcp"):
+        parts = urlsplit(spec)
+        if not parts.hostname or not parts.port:
+            raise ValueError(f"invalid sink {spec!r}; expected {kind}://HOST:PORT")
+        cls = UdpSink if kind == "udp" else TcpSink
+        return cls(spec, parts.hostname, parts.port, queue_size)
+    file_sinks = {"srt": SrtSink, "vtt": VttSink, "jsonl": JsonlSink}
+    if kind not in file_sinks:
+        raise ValueError(f"unknown sink type {kind!r} in {spec!r}")
+    return file_sinks[kind](spec, os.path.expanduser(rest), queue_size, roll_minutes)
+
+
+class OutputSinks:
+    """The set of configured sinks. publish() is safe to call from the worker."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sinks: list[Sink] = []
+        self.queue_size = DEFAULT_QUEUE_SIZE
+        self.roll_minutes = DEFAULT_ROLL_MINUTES
+
+    def configure(
+        self,
+        specs: list[str],
+        queue_size: Optional[int] = None,
+        roll_minutes: Optional[float] = None,
+    ) -> None:
+        """Replace the configured sinks. Raises ValueError on a bad spec (nothing changes).
+
+        Sinks whose spec is unchanged keep running (and keep their file);
+        a new queue size / roll interval is applied to them in place.
+        Repeated specs are configured once; two file sinks writing the same
+        path are rejected.
+        """
+        specs = list(dict.fromkeys(s.strip() for s in specs if s and s.strip()))
+        paths: dict[str, str] = {}
+        for spec in specs:
+            kind, _, rest = spec.partition(":")
+            if kind.lower() in ("srt", "vtt", "jsonl") and rest:
+                path = os.path.abspath(os.path.expanduser(rest))
+                if path in paths:
+                    raise ValueError(f"sinks {paths[path]!r} and {spec!r} write the same file")
+                paths[path] = spec
+        if queue_size is not None:
+            self.queue_size = queue_size
+        if roll_minutes is not None:
+            self.roll_minutes = roll_minutes
+        with self._lock:
+            current = {sink.spec: sink for sink in self._sinks}
+        new_sinks: list[Sink] = []
+        created: list[Sink] = []
+        try:
+            for spec in specs:
+                sink = current.pop(spec, None)
+                if sink is None:
+                    sink = create_sink(spec, self.queue_size, self.roll_minutes)
+                    created.append(sink)
+                else:
+                    sink.set_queue_size(self.queue_size)
+                    sink.set_roll_minutes(self.roll_minutes)
+                new_sinks.append(sink)
+        except Exception:
+            for sink in created:
+                sink.close()
+            raise
+        with self._lock:
+            self._sinks = new_sinks
+        for sink in current.values():
+            sink.close()
+        log.info("output sinks: %s", ", ".join(specs) or "(none)")
+
+    def publish(self, event: dict) -> None:
+        # Copy the list reference under the lock; submit() itself never blocks.
+        with self._lock:
+            sinks = self._sinks
+        for sink in sinks:
+            sink.submit(event)
+
+    def specs(self) -> list[str]:
+        with self._lock:
+            return [sink.spec for sink in self._sinks]
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            return [sink.stats() for sink in self._sinks]
+
+    def close(self) -> None:
+        with self._lock:
+            sinks, self._sinks = self._sinks, []
+        for sink in sinks:
+            sink.close()
+
+
+output_sinks = OutputSinks()
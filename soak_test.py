@@ -0,0 +1,365 @@
+"""Soak / load test harness for the moblin-smart-translation server.
+
+Starts ``app.py`` as a child process with the replay capture source, then for
+the requested duration:
+
+- simulates many ``/display`` clients polling ``/transcript``,
+- cycles the worker through ``/api/worker`` stop/start,
+- switches between the given replay files ("device switching"),
+
+and periodically samples the server's RSS, thread count and ffmpeg child
+processes. A summary (latency percentiles, RSS growth, peak threads, leaked
+ffmpeg processes) is printed at the end and optionally written as JSON.
+
+Example:
+
+    python soak_test.py --replay sample_ja.wav --duration 7200 --clients 40
+
+psutil is used for process stats when installed; otherwise /proc is read
+directly (Linux only).
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+from typing import Optional
+
+
+try:
+    import psutil  # type: ignore[import]
+except Exception:  # noqa: BLE001
+    psutil = None
+
+
+def _http(method: str, url: str, payload: Optional[dict] = None, timeout: float = 10.0) -> tuple[int, bytes]:
+    data = None
+    headers = {}
+    if payload is not None:
+        data = json.dumps(payload).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    req = urllib.request.Request(url, data=data, headers=headers, method=method)
+    try:
+        with urllib.request.urlopen(req, timeout=timeout) as res:
+            return res.status, res.read()
+    except urllib.error.HTTPError as exc:
+        return exc.code, exc.read()
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+def _proc_snapshot(pid: int) -> Optional[dict]:
+    """Return RSS (bytes), thread count and live ffmpeg descendants of pid."""
+    if psutil is not None:
+        try:
+            proc = psutil.Process(pid)
+            children = proc.children(recursive=True)
+            ffmpeg = [c.pid for c in children if "ffmpeg" in (c.name() or "").lower()]
+            return {"rss": proc.memory_info().rss, "threads": proc.num_threads(), "ffmpeg": ffmpeg}
+        except Exception:  # noqa: BLE001
+            return None
+
+    proc_root = Path("/proc")
+    if not proc_root.exists():
+        return None
+    try:
+        status = (proc_root / str(pid) / "status").read_text()
+    except OSError:
+        return None
+    rss = 0
+    threads = 0
+    for line in status.splitlines():
+        if line.startswith("VmRSS:"):
+            rss = int(line.split()[1]) * 1024
+        elif line.startswith("Threads:"):
+            threads = int(line.split()[1])
+
+    parents: dict[int, int] = {}
+    names: dict[int, str] = {}
+    for entry in proc_root.iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # Format: pid (comm) state ppid ...
+        comm_end = stat.rfind(")")
+        names[int(entry.name)] = stat[stat.find("(") + 1 : comm_end]
+        parents[int(entry.name)] = int(stat[comm_end + 2 :].split()[1])
+
+    ffmpeg: list[int] = []
+    for child, name in names.items():
+        cur = parents.get(child)
+        while cur and cur != pid:
+            cur = parents.get(cur)
+        if cur == pid and "ffmpeg" in name.lower():
+            ffmpeg.append(child)
+    return {"rss": rss, "threads": threads, "ffmpeg": ffmpeg}
+
+
+class SoakRun:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.base_url = f"http://{args.host}:{args.port}"
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.latencies: list[float] = []
+        self.errors = 0
+        self.worker_cycles = 0
+        self.worker_errors = 0
+        self.samples: list[dict] = []
+        self.ffmpeg_leaks: list[dict] = []
+        self.lingering: list[dict] = []
+        self.server: Optional[subprocess.Popen] = None
+
+    # -- server lifecycle -------------------------------------------------
+
+    def start_server(self) -> None:
+        cmd = [
+            sys.executable,
+            str(Path(__file__).with_name("app.py")),
+            "--host",
+            self.args.host,
+            "--port",
+            str(self.args.port),
+            "--no-browser",
+        ] + list(self.args.server_arg or [])
+        print(f"[soak] starting server: {' '.join(cmd)}")
+        self.server = subprocess.Popen(cmd)
+
+        deadline = time.monotonic() + 60.0
+        while time.monotonic() < deadline:
+            if self.server.poll() is not None:
+                raise RuntimeError(f"server exited early with code {self.server.returncode}")
+            try:
+                status, _ = _http("GET", self.base_url + "/api/worker", timeout=2.0)
+                if status == 200:
+                    return
+            except Exception:  # noqa: BLE001
+                pass
+            time.sleep(0.5)
+        raise RuntimeError("server did not become ready within 60s")
+
+    def stop_server(self) -> None:
+        if self.server is None:
+            return
+        try:
+            _http("POST", self.base_url + "/api/worker", {"action": "stop"}, timeout=30.0)
+        except Exception:  # noqa: BLE001
+            pass
+        self.server.terminate()
+        try:
+            self.server.wait(timeout=15.0)
+        except subprocess.TimeoutExpired:
+            self.server.kill()
+            self.server.wait()
+
+    # -- load generators --------------------------------------------------
+
+    def _display_client(self) -> None:
+        url = self.base_url + "/transcript"
+        while not self.stop_event.is_set():
+            t0 = time.perf_counter()
+            try:
+                status, _ = _http("GET", url)
+                ok = status == 200
+            except Exception:  # noqa: BLE001
+                ok = False
+            elapsed = time.perf_counter() - t0
+            with self.lock:
+                if ok:
+                    self.latencies.append(elapsed)
+                else:
+                    self.errors += 1
+            self.stop_event.wait(self.args.poll_interval)
+
+    def _worker_payload(self, cycle: int) -> dict:
+        replays = self.args.replay
+        return {
+            "action": "start",
+            "capture_mode": "replay",
+            "replay_path": replays[cycle % len(replays)],
+            "replay_loop": True,
+            "replay_jitter": self.args.jitter,
+            "quality": self.args.quality,
+            "mode": self.args.mode,
+            "vad_level": cycle % 4 if self.args.vary_vad else 0,
+        }
+
+    def _controller(self) -> None:
+        url = self.base_url + "/api/worker"
+        cycle = 0
+        while not self.stop_event.is_set():
+            try:
+                status, body = _http("POST", url, self._worker_payload(cycle), timeout=120.0)
+                if status != 200:
+                    print(f"[soak] worker start failed: {status} {body[:200]!r}")
+                    with self.lock:
+                        self.worker_errors += 1
+            except Exception as exc:  # noqa: BLE001
+                print(f"[soak] worker start raised: {exc!r}")
+                with self.lock:
+                    self.worker_errors += 1
+
+            if self.stop_event.wait(self.args.restart_interval):
+                break
+
+            try:
+                status, body = _http("POST", url, {"action": "stop"}, timeout=120.0)
+                stopped = json.loads(body or b"{}") if status == 200 else {}
+                if stopped.get("lingering_workers"):
+                    print(f"[soak] lingering workers after stop: {stopped['lingering_workers']}")
+                    with self.lock:
+                        self.lingering.append({"t": time.time(), "workers": stopped["lingering_workers"]})
+            except Exception as exc:  # noqa: BLE001
+                print(f"[soak] worker stop raised: {exc!r}")
+                with self.lock:
+                    self.worker_errors += 1
+
+            # With the worker stopped no ffmpeg child should remain.
+            time.sleep(self.args.leak_grace)
+            snap = _proc_snapshot(self.server.pid) if self.server else None
+            if snap and snap["ffmpeg"]:
+                print(f"[soak] leaked ffmpeg processes after stop: {snap['ffmpeg']}")
+                with self.lock:
+                    self.ffmpeg_leaks.append({"t": time.time(), "pids": snap["ffmpeg"]})
+
+            with self.lock:
+                self.worker_cycles += 1
+            cycle += 1
+
+    def _monitor(self) -> None:
+        while not self.stop_event.is_set():
+            snap = _proc_snapshot(self.server.pid) if self.server else None
+            if snap is not None:
+                snap = {"t": time.time(), "rss": snap["rss"], "threads": snap["threads"], "ffmpeg": len(snap["ffmpeg"])}
+                with self.lock:
+                    self.samples.append(snap)
+            self.stop_event.wait(self.args.sample_interval)
+
+    def _report(self, final: bool = False) -> dict:
+        with self.lock:
+            lat = sorted(self.latencies)
+            samples = list(self.samples)
+            summary = {
+                "requests": len(lat),
+                "errors": self.errors,
+                "worker_cycles": self.worker_cycles,
+                "worker_errors": self.worker_errors,
+                "latency_ms": {
+                    "p50": _percentile(lat, 50) * 1000.0,
+                    "p90": _percentile(lat, 90) * 1000.0,
+                    "p99": _percentile(lat, 99) * 1000.0,
+                    "max": (lat[-1] if lat else 0.0) * 1000.0,
+                },
+                "ffmpeg_leaks": list(self.ffmpeg_leaks),
+                "lingering_workers": list(self.lingering),
+            }
+        if samples:
+            summary["rss_mb"] = {
+                "start": samples[0]["rss"] / 1e6,
+                "end": samples[-1]["rss"] / 1e6,
+                "max": max(s["rss"] for s in samples) / 1e6,
+                "growth": (samples[-1]["rss"] - samples[0]["rss"]) / 1e6,
+            }
+            summary["threads"] = {
+                "start": samples[0]["threads"],
+                "end": samples[-1]["threads"],
+                "max": max(s["threads"] for s in samples),
+            }
+        if final:
+            summary["samples"] = samples
+        return summary
+
+    def run(self) -> dict:
+        self.start_server()
+        threads = [threading.Thread(target=self._display_client, daemon=True) for _ in range(self.args.clients)]
+        threads.append(threading.Thread(target=self._controller, daemon=True))
+        threads.append(threading.Thread(target=self._monitor, daemon=True))
+        for t in threads:
+            t.start()
+
+        started = time.monotonic()
+        try:
+            while time.monotonic() - started < self.args.duration:
+                if self.server is not None and self.server.poll() is not None:
+                    print(f"[soak] server exited with code {self.server.returncode}")
+                    break
+                time.sleep(min(self.args.report_interval, self.args.duration))
+                brief = self._report()
+                print(f"[soak] t={time.monotonic() - started:.0f}s {json.dumps(brief)}")
+        except KeyboardInterrupt:
+            print("[soak] interrupted; finishing up")
+        finally:
+            self.stop_event.set()
+            for t in threads:
+                t.join(timeout=5.0)
+            self.stop_server()
+        return self._report(final=True)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="moblin-smart-translation soak / load test")
+    parser.add_argument(
+        "--replay",
+        action="append",
+        required=True,
+        help="Media file to replay as the capture source. Repeat to switch between files on each restart.",
+    )
+    parser.add_argument("--duration", type=float, default=3600.0, help="Total run time in seconds. Default: 3600")
+    parser.add_argument("--clients", type=int, default=20, help="Number of simulated /display clients. Default: 20")
+    parser.add_argument("--poll-interval", type=float, default=0.3, help="Per-client /transcript poll interval (s)")
+    parser.add_argument("--restart-interval", type=float, default=60.0, help="Seconds between worker stop/start cycles")
+    parser.add_argument("--leak-grace", type=float, default=2.0, help="Seconds to wait after stop before counting ffmpeg")
+    parser.add_argument("--sample-interval", type=float, default=5.0, help="Seconds between RSS/thread samples")
+    parser.add_argument("--report-interval", type=float, default=60.0, help="Seconds between progress reports")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Replay capture jitter in seconds")
+    parser.add_argument("--quality", default="ultra_low", help="Worker quality preset. Default: ultra_low")
+    parser.add_argument("--mode", default="translate", choices=["translate", "transcribe"])
+    parser.add_argument("--vary-vad", action="store_true", help="Cycle vad_level 0..3 across restarts")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument(
+        "--server-arg",
+        action="append",
+        help="Extra argument passed to app.py (repeatable), e.g. --server-arg=--device --server-arg=cuda",
+    )
+    parser.add_argument("--output", default=None, help="Write the final summary (with samples) as JSON here")
+    return parser.parse_args()
+
+
+def main() -> None:
+    args = parse_args()
+    for path in args.replay:
+        if not os.path.exists(path):
+            raise SystemExit(f"replay file not found: {path}")
+    args.replay = [os.path.abspath(p) for p in args.replay]
+
+    summary = SoakRun(args).run()
+    printable = {k: v for k, v in summary.items() if k != "samples"}
+    print("[soak] summary:")
+    print(json.dumps(printable, indent=2))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+        print(f"[soak] wrote {args.output}")
+    if summary["ffmpeg_leaks"] or summary["lingering_workers"] or summary["errors"] or summary["worker_errors"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Stitch ASR text from overlapping audio windows.
+
+With ``overlap_seconds`` > 0 the worker decodes windows that share their
+first ``overlap_seconds`` with the end of the previous window, so words cut
+at a boundary are heard whole in one of the two windows. The text of the
+shared audio then appears twice; ``TranscriptStitcher`` removes it before
+the text goes on to MT and the TranscriptBuffer.
+
+Alignment is token level: characters for Japanese / Chinese / Korean text,
+words otherwise, compared case- and punctuation-insensitively. The search
+is limited to the tokens that can plausibly have been spoken during the
+overlap, and a match must reach (close to) the end of the previous
+window's text, so repeated phrases further back are not mistaken for the
+overlap. When nothing aligns, the new text is passed through unchanged.
+
+Text alone cannot tell the shared audio from a genuine repetition: a short
+utterance that fits in the overlap and repeats the end of the previous
+window (e.g. "ありがとうございます" twice) is treated as the same speech
+decoded twice and comes back empty. Only overlap mode does this; with
+``overlap_seconds`` = 0 every window is passed through.
+"""
+
+import math
+import re
+from typing import Optional
+
+
+# Generous speech rates used to size the search span over the overlap.
+CHARS_PER_SECOND = 10.0
+WORDS_PER_SECOND = 4.0
+# Shortest run of tokens accepted as the shared part.
+MIN_MATCH_CHARS = 3
+MIN_MATCH_WORDS = 2
+
+_CJK_RE = re.compile(r"[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_LEADING_PUNCT = " 　、。，．,.!?！？・…"
+
+
+def _normalize(token: str) -> str:
+    return "".join(ch for ch in token.lower() if ch.isalnum())
+
+
+def _tokenize(text: str) -> tuple[list[str], bool]:
+    """Return (tokens, is_cjk). CJK tokens are single characters, spaces kept."""
+    if _CJK_RE.search(text):
+        return list(text), True
+    return text.split(), False
+
+
+def _keys(tokens: list[str]) -> list[tuple[str, int]]:
+    """(normalized token, original index) for tokens that are not pure punctuation."""
+    keyed = []
+    for i, token in enumerate(tokens):
+        key = _normalize(token)
+        if key:
+            keyed.append((key, i))
+    return keyed
+
+
+class TranscriptStitcher:
+    def __init__(self, overlap_seconds: float = 0.0) -> None:
+        self.overlap_seconds = overlap_seconds
+        self._previous: Optional[tuple[list[str], bool]] = None
+
+    def reset(self) -> None:
+        """Forget the previous window (after a gap, source switch, etc.)."""
+        self._previous = None
+
+    def stitch(self, text: str) -> str:
+        """Return the part of ``text`` that was not already in the previous window."""
+        tokens, cjk = _tokenize(text)
+        previous, self._previous = self._previous, (tokens, cjk)
+        if self.overlap_seconds <= 0 or previous is None or not tokens or previous[1] != cjk:
+            return text
+
+        rate, min_match = (CHARS_PER_SECOND, MIN_MATCH_CHARS) if cjk else (WORDS_PER_SECOND, MIN_MATCH_WORDS)
+        span = int(math.ceil(self.overlap_seconds * rate * 1.5)) + min_match
+        # Whisper often drops or garbles the last word of a window, so the
+        # match may end a little before the previous text does.
+        slack = max(min_match, span // 3)
+
+        prev_keys = [k for k, _ in _keys(previous[0])[-span:]]
+        new_keyed = _keys(tokens)[: span + slack]
+        new_keys = [k for k, _ in new_keyed]
+        # Score each exact run by its length minus how far it ends from the
+        # end of the previous text, so the true suffix/prefix overlap beats
+        # a longer phrase that merely repeats earlier on.
+        best: Optional[tuple[int, int, int]] = None
+        for i in range(len(prev_keys)):
+            for j in range(len(new_keys)):
+                run = 0
+                while i + run < len(prev_keys) and j + run < len(new_keys) and prev_keys[i + run] == new_keys[j + run]:
+                    run += 1
+                gap = len(prev_keys) - (i + run)
+                if run < min_match or gap > slack:
+                    continue
+                score = run - gap
+                if best is None or score > best[0]:
+                    best = (score, j, run)
+        if best is None:
+            return text
+
+        _, j, run = best
+        cut = new_keyed[j + run - 1][1] + 1
+        rest = ("" if cjk else " ").join(tokens[cut:])
+        return rest.lstrip(_LEADING_PUNCT).strip()
@@ -1,244 +1,733 @@
 from pathlib import Path
+import json
 import os
+import platform
 import sys
-from typing import Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Optional
 
 import numpy as np
 from faster_whisper import WhisperModel
+from faster_whisper.utils import download_model
 import ctranslate2
 import sentencepiece as spm
 from huggingface_hub import snapshot_download
 
+from log_setup import get_logger
+from stitching import TranscriptStitcher
 
-def create_model(device_mode: str = "cpu", quality: str = "normal") -> WhisperModel:
-    """Create a kotoba-whisper-v2.2-faster model for translation.
 
-    device_mode: "cpu" or "cuda". Defaults to CPU.
-    quality: str
-        One of "ultra_low", "low", "normal", "high", "ultra_high".
+model_log = get_logger("model")
+mt_log = get_logger("ja-en")
+
+
+WHISPER_MODEL_ID = "RoachLin/kotoba-whisper-v2.2-faster"
+
+# Quality preset -> Whisper checkpoint + decoding settings. The lighter
+# presets use smaller multilingual checkpoints so they save encoder cost
+# too, not only beam width. Any checkpoint can be overridden per preset with
+# MST_WHISPER_MODEL_<PRESET> (a Hugging Face id or a local CTranslate2 dir),
+# e.g. MST_WHISPER_MODEL_ULTRA_LOW=D:\models\my-whisper-ct2.
+QUALITY_PRESETS: dict[str, dict] = {
+    "ultra_low": {"model_id": "Systran/faster-whisper-base", "beam_size": 1, "best_of": 1},
+    "low": {"model_id": "Systran/faster-whisper-small", "beam_size": 2, "best_of": 2},
+    "normal": {"model_id": WHISPER_MODEL_ID, "beam_size": 3, "best_of": 3},
+    "high": {"model_id": WHISPER_MODEL_ID, "beam_size": 4, "best_of": 4},
+    "ultra_high": {"model_id": WHISPER_MODEL_ID, "beam_size": 5, "best_of": 5},
+}
+DEFAULT_QUALITY = "normal"
+# Checkpoints fine-tuned for Japanese only: language detection on them is
+# wasted work and unreliable, so "auto" means Japanese there.
+JAPANESE_ONLY_MODELS = {WHISPER_MODEL_ID}
+
+# Draft mode: re-run a segment on the full model when the draft's mean
+# avg_logprob falls below this, or its compression ratio looks like a loop.
+DRAFT_MIN_AVG_LOGPROB = -0.8
+DRAFT_MAX_COMPRESSION_RATIO = 2.4
+JA_EN_MODEL_ID = "entai2965/sugoi-v4-ja-en-ctranslate2"
+# MT always runs on CPU; even with CUDA available, ASR is the bottleneck.
+# autotune.py tunes the translator for this device only.
+TRANSLATOR_DEVICE = "cpu"
+
+# Per-machine settings written by autotune.py.
+TUNING_PROFILE_PATH = Path(sys.prefix) / "models" / "autotune_profile.json"
+
 
-    Note: The underlying model is always RoachLin/kotoba-whisper-v2.2-faster
-    (a CTranslate2 export). The quality preset only affects decoding settings,
-    not which checkpoint is loaded.
+def machine_fingerprint() -> dict:
+    """Identify the machine a tuning profile was measured on."""
+    return {
+        "node": platform.node(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count() or 1,
+    }
+
+
+def load_tuning_profile() -> dict:
+    """Return the autotune profile for this machine, or {} if there is none.
+
+    A profile measured on a different machine (e.g. a copied venv) is ignored.
     """
-    device_mode = (device_mode or "cpu").lower()
-    quality = (quality or "normal").lower()
+    try:
+        with open(TUNING_PROFILE_PATH, encoding="utf-8") as f:
+            profile = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except Exception as exc:  # noqa: BLE001
+        model_log.warning("could not read tuning profile %s (%r); using defaults", TUNING_PROFILE_PATH, exc)
+        return {}
+    if profile.get("fingerprint") != machine_fingerprint():
+        model_log.warning("tuning profile %s was measured on another machine; ignoring it", TUNING_PROFILE_PATH)
+        return {}
+    return profile
 
-    # Safety gate: by default, even if "cuda" is選択, 実際のロードは CPU に強制。
-    # CUDA を本当に使いたい場合だけ MST_ENABLE_CUDA=1 を環境変数で明示する。
-    use_cuda = device_mode == "cuda" and os.environ.get("MST_ENABLE_CUDA") == "1"
-    if use_cuda:
-        device = "cuda"
+
+def _whisper_cache_root() -> Path:
+    # Use a cache directory under the current Python environment so that
+    # models stay inside the venv (e.g. .venv/models/faster-whisper).
+    cache_root = Path(sys.prefix) / "models" / "faster-whisper"
+    cache_root.mkdir(parents=True, exist_ok=True)
+    return cache_root
+
+
+def _default_whisper_settings(device: str) -> dict:
+    if device == "cuda":
         # Use int8_float16 on CUDA to reduce VRAM usage while keeping
         # reasonable accuracy.
-        compute_type = "int8_float16"
+        return {"compute_type": "int8_float16", "cpu_threads": 0, "num_workers": 1}
+    # On CPU we keep everything int8 for memory/latency.
+    return {"compute_type": "int8", "cpu_threads": 0, "num_workers": 1}
+
+
+def whisper_settings(device: str, model_id: str = WHISPER_MODEL_ID) -> dict:
+    """compute_type / cpu_threads / num_workers for a Whisper checkpoint.
+
+    Values come from the autotune profile when one exists for this machine,
+    device and model; otherwise the built-in defaults are used.
+    """
+    settings = _default_whisper_settings(device)
+    tuned = load_tuning_profile().get("whisper", {}).get(device, {}).get(model_id)
+    if tuned:
+        settings.update({k: tuned[k] for k in settings if k in tuned})
+    return settings
+
+
+def translator_settings(device: str) -> dict:
+    """compute_type / inter_threads / intra_threads for the ja→en translator."""
+    settings = {"compute_type": "default", "inter_threads": 1, "intra_threads": 0}
+    tuned = load_tuning_profile().get("translator", {}).get(device)
+    if tuned:
+        settings.update({k: tuned[k] for k in settings if k in tuned})
+    return settings
+
+
+def quality_preset(quality: Optional[str]) -> dict:
+    """Resolve a quality name to {model_id, beam_size, best_of}.
+
+    Unknown names get the default checkpoint with greedy decoding (beam 1),
+    like before presets selected checkpoints.
+    """
+    name = (quality or DEFAULT_QUALITY).lower()
+    if name in QUALITY_PRESETS:
+        preset = dict(QUALITY_PRESETS[name])
     else:
-        device = "cpu"
-        # On CPU we keep everything int8 for memory/latency.
-        compute_type = "int8"
+        name = DEFAULT_QUALITY
+        preset = dict(QUALITY_PRESETS[name], beam_size=1, best_of=1)
+    override = os.environ.get(f"MST_WHISPER_MODEL_{name.upper()}")
+    if override:
+        preset["model_id"] = override
+    return preset
 
-    # Fixed model id for kotoba-whisper-v2.2-faster.
-    model_id = "RoachLin/kotoba-whisper-v2.2-faster"
 
-    # Use a cache directory under the current Python environment so that
-    # models stay inside the venv (e.g. .venv/models/faster-whisper).
-    env_root = Path(sys.prefix)
-    cache_root = env_root / "models" / "faster-whisper"
-    cache_root.mkdir(parents=True, exist_ok=True)
+def resolve_whisper_model(model_id: str) -> str:
+    """Return a local directory for a Whisper checkpoint.
+
+    Local directories are used as-is. Hub ids are looked up in the
+    sys.prefix/models/faster-whisper cache first and only downloaded when
+    missing, so switching presets does not hit the network every time.
+    """
+    if os.path.isdir(model_id):
+        return model_id
+    cache_root = str(_whisper_cache_root())
+    try:
+        return download_model(model_id, local_files_only=True, cache_dir=cache_root)
+    except Exception:  # noqa: BLE001
+        model_log.info("downloading %s into %s ...", model_id, cache_root)
+        return download_model(model_id, cache_dir=cache_root)
+
+
+_model_cache: dict[tuple[str, str], WhisperModel] = {}
+# Checkpoints being loaded; the lock is never held across a download or
+# WhisperModel construction.
+_model_loading: dict[tuple[str, str], Future] = {}
+_model_cache_lock = threading.Lock()
+
+
+def _resolve_device(device_mode: str) -> str:
+    # Safety gate: by default, even if "cuda" is選択, 実際のロードは CPU に強制。
+    # CUDA を本当に使いたい場合だけ MST_ENABLE_CUDA=1 を環境変数で明示する。
+    device_mode = (device_mode or "cpu").lower()
+    use_cuda = device_mode == "cuda" and os.environ.get("MST_ENABLE_CUDA") == "1"
+    return "cuda" if use_cuda else "cpu"
+
+
+def create_model(device_mode: str = "cpu", quality: str = "normal") -> WhisperModel:
+    """Return the Whisper model for a quality preset, loading it on first use.
+
+    device_mode: "cpu" or "cuda". Defaults to CPU.
+    quality: str
+        One of "ultra_low", "low", "normal", "high", "ultra_high". Selects
+        the checkpoint (see QUALITY_PRESETS) as well as decoding settings.
+
+    Loaded models are cached per (checkpoint, device), so presets that share
+    a checkpoint share one instance. compute_type and thread counts come
+    from the autotune profile (see autotune.py) when one exists.
+    """
+    device = _resolve_device(device_mode)
+    model_id = quality_preset(quality)["model_id"]
+
+    key = (model_id, device)
+    with _model_cache_lock:
+        model = _model_cache.get(key)
+        if model is not None:
+            return model
+        # Only one thread loads a given checkpoint; the others wait on its
+        # future, and other checkpoints stay available meanwhile.
+        loading = _model_loading.get(key)
+        if loading is None:
+            future: Future = Future()
+            _model_loading[key] = future
+    if loading is not None:
+        return loading.result()
+
+    try:
+        model = _load_whisper_model(model_id, device)
+    except BaseException as exc:
+        with _model_cache_lock:
+            if _model_loading.get(key) is future:
+                del _model_loading[key]
+        future.set_exception(exc)
+        raise
+    with _model_cache_lock:
+        # Skip caching if release_models() dropped it while it was loading.
+        if _model_loading.get(key) is future:
+            del _model_loading[key]
+            _model_cache[key] = model
+    future.set_result(model)
+    return model
+
+
+def release_models(keep: tuple[str, ...] = ()) -> None:
+    """Drop cached Whisper models whose checkpoint id is not in ``keep``.
+
+    A model still referenced elsewhere (e.g. by a worker that is shutting
+    down) is freed once that reference goes away.
+    """
+    with _model_cache_lock:
+        for key in list(_model_cache):
+            if key[0] not in keep:
+                model_log.info("releasing model %r on %r", key[0], key[1])
+                del _model_cache[key]
+        for key in list(_model_loading):
+            if key[0] not in keep:
+                del _model_loading[key]
+
+
+def _load_whisper_model(model_id: str, device: str) -> WhisperModel:
+    settings = whisper_settings(device, model_id)
+    model_path = resolve_whisper_model(model_id)
 
     # Debug: log which model is being used and where it is cached.
-    print(
-        f"[model] creating kotoba-whisper-v2.2-faster model_id={model_id!r} "
-        f"device={device!r} compute_type={compute_type!r} cache_root={str(cache_root)!r}"
+    model_log.info(
+        "creating whisper model model_id=%r device=%r settings=%r path=%r",
+        model_id,
+        device,
+        settings,
+        model_path,
     )
 
     try:
-        model = WhisperModel(
-            model_id,
-            device=device,
-            compute_type=compute_type,
-            download_root=str(cache_root),
-        )
-        return model
+        return WhisperModel(model_path, device=device, **settings)
     except Exception as exc:  # noqa: BLE001
         # If CUDA initialisation fails (missing cudnn DLL, invalid handle, etc.),
         # fall back to CPU so the process does not crash (for environments
         # without a proper CUDA/cuDNN setup). Logs will clearly state that
         # CPU is being used instead.
         if device == "cuda":
-            print(
-                f"[model warning] CUDA initialisation failed ({exc!r}); "
-                "falling back to CPU (int8).",
-            )
             fallback_device = "cpu"
-            fallback_compute_type = "int8"
-            print(
-                f"[model] retrying on device={fallback_device!r} "
-                f"compute_type={fallback_compute_type!r}",
+            fallback_settings = whisper_settings(fallback_device, model_id)
+            model_log.warning(
+                "CUDA initialisation failed (%r); falling back to CPU (%s).",
+                exc,
+                fallback_settings["compute_type"],
             )
-            model = WhisperModel(
-                model_id,
-                device=fallback_device,
-                compute_type=fallback_compute_type,
-                download_root=str(cache_root),
+            model_log.info(
+                "retrying on device=%r settings=%r",
+                fallback_device,
+                fallback_settings,
             )
-            return model
+            return WhisperModel(model_path, device=fallback_device, **fallback_settings)
         raise
 
 
-_ja_en_translator: Optional[ctranslate2.Translator] = None
-_ja_en_sp_src: Optional[spm.SentencePieceProcessor] = None
-_ja_en_sp_tgt: Optional[spm.SentencePieceProcessor] = None
-
-
-def _ensure_ja_en_translator(
-    device: str = "cpu",
-) -> tuple[ctranslate2.Translator, spm.SentencePieceProcessor, spm.SentencePieceProcessor]:
-    """Lazily download and load the ja→en CTranslate2 model.
-
-    Uses entai2965/sugoi-v4-ja-en-ctranslate2 from Hugging Face Hub and
-    caches it under the current Python environment (e.g. .venv/models/ctranslate2).
-    """
-
-    global _ja_en_translator, _ja_en_sp_src, _ja_en_sp_tgt
-    if _ja_en_translator is not None and _ja_en_sp_src is not None and _ja_en_sp_tgt is not None:
-        return _ja_en_translator, _ja_en_sp_src, _ja_en_sp_tgt
-
-    env_root = Path(sys.prefix)
-    base_dir = env_root / "models" / "ctranslate2" / "sugoi-v4-ja-en-ctranslate2"
+# Translation models per (source, target) language pair. Entries:
+#   path        local CTranslate2 model directory
+#   repo_id     Hugging Face repo to download into ``path`` when missing
+#   sp_source / sp_target   SentencePiece models, relative to ``path``
+#   source_prefix / target_prefix   optional token lists (e.g. NLLB codes)
+# More pairs can be added with register_translator() or in
+# <venv>/models/ctranslate2/pairs.json (a list of objects with the keys
+# above plus "source" and "target"; relative paths are resolved against
+# the json file's directory).
+TRANSLATOR_ROOT = Path(sys.prefix) / "models" / "ctranslate2"
+TRANSLATOR_PAIRS_PATH = TRANSLATOR_ROOT / "pairs.json"
+TARGET_LANGUAGE = "en"
+DEFAULT_MT_MEMORY_MB = 2048
+
+_translator_registry: dict[tuple[str, str], dict] = {
+    ("ja", "en"): {
+        "path": str(TRANSLATOR_ROOT / "sugoi-v4-ja-en-ctranslate2"),
+        "repo_id": JA_EN_MODEL_ID,
+        "sp_source": "spm/spm.ja.nopretok.model",
+        "sp_target": "spm/spm.en.nopretok.model",
+    },
+}
+_translator_pairs_loaded = False
+_translator_registry_lock = threading.Lock()
+
+
+def register_translator(
+    source: str,
+    target: str,
+    path: str,
+    sp_source: str,
+    sp_target: str,
+    repo_id: Optional[str] = None,
+    source_prefix: Optional[list[str]] = None,
+    target_prefix: Optional[list[str]] = None,
+) -> None:
+    """Add or replace the translation model for a language pair."""
+    with _translator_registry_lock:
+        _translator_registry[(source, target)] = {
+            "path": path,
+            "repo_id": repo_id,
+            "sp_source": sp_source,
+            "sp_target": sp_target,
+            "source_prefix": source_prefix,
+            "target_prefix": target_prefix,
+        }
+
+
+def _load_translator_pairs_file() -> None:
+    global _translator_pairs_loaded
+    _translator_pairs_loaded = True
+    if not TRANSLATOR_PAIRS_PATH.exists():
+        return
+    try:
+        with open(TRANSLATOR_PAIRS_PATH, encoding="utf-8") as f:
+            entries = json.load(f)
+    except Exception as exc:  # noqa: BLE001
+        mt_log.warning("could not read %s (%r)", TRANSLATOR_PAIRS_PATH, exc)
+        return
+    if not isinstance(entries, list):
+        mt_log.warning("ignoring %s: expected a list of pairs, got %s", TRANSLATOR_PAIRS_PATH, type(entries).__name__)
+        return
+    for entry in entries:
+        if not isinstance(entry, dict):
+            mt_log.warning("ignoring invalid entry in %s: %r (not an object)", TRANSLATOR_PAIRS_PATH, entry)
+            continue
+        try:
+            spec = {k: entry.get(k) for k in ("repo_id", "sp_source", "sp_target", "source_prefix", "target_prefix")}
+            spec["path"] = str(TRANSLATOR_PAIRS_PATH.parent / entry["path"])
+            _translator_registry[(entry["source"], entry["target"])] = spec
+        except (KeyError, TypeError) as exc:
+            mt_log.warning("ignoring invalid entry in %s: %r (%r)", TRANSLATOR_PAIRS_PATH, entry, exc)
+
+
+def translator_spec(source: str, target: str) -> Optional[dict]:
+    """Registry entry for a language pair, or None when there is no model."""
+    with _translator_registry_lock:
+        if not _translator_pairs_loaded:
+            _load_translator_pairs_file()
+        spec = _translator_registry.get((source, target))
+        return dict(spec) if spec else None
+
+
+def _ensure_translator_dir(spec: dict) -> Path:
+    """Download (once, if a repo_id is known) and return the model directory."""
+    base_dir = Path(spec["path"])
     if not base_dir.exists():
+        if not spec.get("repo_id"):
+            raise RuntimeError(f"translation model directory not found: {base_dir}")
         base_dir.parent.mkdir(parents=True, exist_ok=True)
-        print("[ja-en] downloading entai2965/sugoi-v4-ja-en-ctranslate2 ...")
+        mt_log.info("downloading %s ...", spec["repo_id"])
         snapshot_download(
-            "entai2965/sugoi-v4-ja-en-ctranslate2",
+            spec["repo_id"],
             local_dir=str(base_dir),
             local_dir_use_symlinks=False,
         )
+    return base_dir
+
 
-    sp_dir = base_dir / "spm"
-    src_path = sp_dir / "spm.ja.nopretok.model"
-    tgt_path = sp_dir / "spm.en.nopretok.model"
+def _load_sentencepiece(
+    base_dir: Path,
+    spec: dict,
+) -> tuple[spm.SentencePieceProcessor, spm.SentencePieceProcessor]:
+    src_path = base_dir / spec["sp_source"]
+    tgt_path = base_dir / spec["sp_target"]
     if not src_path.exists() or not tgt_path.exists():
         raise RuntimeError(
             "sentencepiece models not found; expected "
             f"{src_path} and {tgt_path}",
         )
 
-    print(f"[ja-en] loading SentencePiece models from {src_path} and {tgt_path}")
+    mt_log.info("loading SentencePiece models from %s and %s", src_path, tgt_path)
     sp_src = spm.SentencePieceProcessor()
     sp_src.load(str(src_path))
     sp_tgt = spm.SentencePieceProcessor()
     sp_tgt.load(str(tgt_path))
+    return sp_src, sp_tgt
 
-    # CTranslate2 Translator can run on CPU; we keep that as default for safety.
-    ct_device = "cpu" if device not in ("cuda",) else "cuda"
-    print(f"[ja-en] loading CTranslate2 translator on device={ct_device!r} ...")
-    translator = ctranslate2.Translator(str(base_dir), device=ct_device)
 
-    _ja_en_translator = translator
-    _ja_en_sp_src = sp_src
-    _ja_en_sp_tgt = sp_tgt
-    return translator, sp_src, sp_tgt
+def _model_size_bytes(base_dir: Path) -> int:
+    # The weights file dominates resident memory; fall back to the whole dir.
+    weights = base_dir / "model.bin"
+    if weights.exists():
+        return weights.stat().st_size
+    return sum(p.stat().st_size for p in base_dir.rglob("*") if p.is_file())
 
 
-def _ja_to_en(text: str, device: str = "cpu") -> str:
-    """Translate Japanese text to English using the Sugoi v4 ja-en NMT model."""
+class TranslatorPool:
+    """Lazily loaded CTranslate2 translators, evicted LRU over a memory budget.
 
-    text = text.strip()
-    if not text:
-        return ""
+    The budget is compared against the size of each model's weights on
+    disk. The most recently used translator is never evicted, so a single
+    model larger than the budget still works.
+    """
 
-    translator, sp_src, sp_tgt = _ensure_ja_en_translator(device=device)
+    def __init__(self, memory_budget_mb: float = DEFAULT_MT_MEMORY_MB) -> None:
+        self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+        self._entries: "OrderedDict[tuple[str, str, str], dict]" = OrderedDict()
+        self._loading: dict[tuple[str, str, str], Future] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def set_budget(self, memory_budget_mb: float) -> None:
+        with self._lock:
+            self.memory_budget = int(memory_budget_mb * 1024 * 1024)
+            self._evict()
+
+    def get(self, source: str, target: str, device: str = "cpu") -> Optional[dict]:
+        """Return the loaded entry for a pair, or None if no model exists."""
+        spec = translator_spec(source, target)
+        if spec is None:
+            return None
+        # CTranslate2 Translator can run on CPU; we keep that as default for safety.
+        ct_device = "cpu" if device not in ("cuda",) else "cuda"
+        key = (source, target, ct_device)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+            # Only one thread loads a given pair; the others wait on its
+            # future. The lock itself is never held across the download /
+            # model build, so stats() and clear() stay responsive.
+            loading = self._loading.get(key)
+            if loading is None:
+                future: Future = Future()
+                self._loading[key] = future
+                generation = self._generation
+        if loading is not None:
+            return loading.result()
+
+        try:
+            entry = self._load(spec, source, target, ct_device)
+        except BaseException as exc:
+            with self._lock:
+                self._loading.pop(key, None)
+            future.set_exception(exc)
+            raise
+        with self._lock:
+            self._loading.pop(key, None)
+            # Skip caching if clear() ran while this was loading.
+            if generation == self._generation:
+                self._entries[key] = entry
+                self._evict()
+        future.set_result(entry)
+        return entry
+
+    @staticmethod
+    def _load(spec: dict, source: str, target: str, ct_device: str) -> dict:
+        base_dir = _ensure_translator_dir(spec)
+        sp_src, sp_tgt = _load_sentencepiece(base_dir, spec)
+        settings = translator_settings(ct_device)
+        mt_log.info(
+            "loading CTranslate2 translator %s→%s on device=%r settings=%r ...",
+            source,
+            target,
+            ct_device,
+            settings,
+        )
+        return {
+            "translator": ctranslate2.Translator(str(base_dir), device=ct_device, **settings),
+            "sp_source": sp_src,
+            "sp_target": sp_tgt,
+            "source_prefix": spec.get("source_prefix"),
+            "target_prefix": spec.get("target_prefix"),
+            "size": _model_size_bytes(base_dir),
+        }
+
+    def translate(self, text: str, source: str, target: str, device: str = "cpu") -> Optional[str]:
+        """Translate text, or return None when the pair has no model."""
+        text = text.strip()
+        if not text:
+            return ""
+        entry = self.get(source, target, device)
+        if entry is None:
+            return None
+        return _translate_with(
+            entry["translator"],
+            entry["sp_source"],
+            entry["sp_target"],
+            text,
+            source_prefix=entry["source_prefix"],
+            target_prefix=entry["target_prefix"],
+        )
+
+    def stats(self) -> list[dict]:
+        with self._lock:
+            return [
+                {"source": k[0], "target": k[1], "device": k[2], "size_mb": round(e["size"] / 1e6, 1)}
+                for k, e in self._entries.items()
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def _evict(self) -> None:
+        # Caller holds self._lock.
+        while len(self._entries) > 1 and sum(e["size"] for e in self._entries.values()) > self.memory_budget:
+            key, _entry = self._entries.popitem(last=False)
+            mt_log.info("evicting translator %s→%s on %r (memory budget)", *key)
 
-    # Tokenize to subwords (source side = Japanese).
-    pieces = sp_src.encode(text, out_type=str)
+
+translator_pool = TranslatorPool(float(os.environ.get("MST_MT_MEMORY_MB", DEFAULT_MT_MEMORY_MB)))
+
+
+def _translate_with(
+    translator: ctranslate2.Translator,
+    sp_src: spm.SentencePieceProcessor,
+    sp_tgt: spm.SentencePieceProcessor,
+    text: str,
+    source_prefix: Optional[list[str]] = None,
+    target_prefix: Optional[list[str]] = None,
+) -> str:
+    # Tokenize to subwords (source side).
+    pieces = list(source_prefix or []) + sp_src.encode(text, out_type=str)
     # CTranslate2 expects a list-of-list (batch of token sequences).
     results = translator.translate_batch(
         [pieces],
         beam_size=4,
         max_decoding_length=256,
+        target_prefix=[list(target_prefix)] if target_prefix else None,
     )
     if not results or not results[0].hypotheses:
         return ""
     tokens = results[0].hypotheses[0]
-    # SentencePiece decode from tokens back to string (target side = English).
+    # SentencePiece decode from tokens back to string (target side).
     # Tokens may contain special markers; filter them lightly.
-    clean_tokens = [t for t in tokens if not t.startswith("<")]
+    skip = set(target_prefix or [])
+    clean_tokens = [t for t in tokens if not t.startswith("<") and t not in skip]
     return sp_tgt.decode(clean_tokens).strip()
 
 
-def translate_segment(
-    model: WhisperModel,
-    audio: np.ndarray,
-    sample_rate: int = 16000,
-    mode: str = "translate",
-    language: str | None = None,
-    quality: str = "normal",
-) -> str:
-    """Run speech-to-text for a single audio segment.
+# Latin-script languages Whisper may report; Latin text from anything else
+# (e.g. English words inside a Japanese stream) is treated as English.
+_LATIN_LANGUAGES = {"en", "fr", "de", "es", "it", "pt", "nl", "pl", "sv", "tr", "id", "vi", "ms", "ro", "cs"}
 
-    - mode="transcribe" -> return Japanese transcription (kotoba-whisper).
-    - mode="translate"  -> Japanese transcription, then offline ja→en translation.
-    """
-    if audio.size == 0:
-        return ""
 
-    quality = (quality or "normal").lower()
-    if quality == "ultra_low":
-        beam_size = 1
-        best_of = 1
-    elif quality == "low":
-        beam_size = 2
-        best_of = 2
-    elif quality == "normal":
-        beam_size = 3
-        best_of = 3
-    elif quality == "high":
-        beam_size = 4
-        best_of = 4
-    elif quality == "ultra_high":
-        beam_size = 5
-        best_of = 5
-    else:
-        beam_size = 1
-        best_of = 1
+def detect_text_language(text: str, asr_language: Optional[str] = None) -> Optional[str]:
+    """Cheap script-based language guess for ASR output.
 
-    # Stage 1: kotoba-whisper for Japanese ASR.
-    # Always run in "transcribe" mode with language="ja" to leverage
-    # the Japanese-specialised training.
-    #
+    Returns a language code, or None when the text has no letters. Kana
+    always means Japanese. Han-only text follows the ASR language when that
+    is Japanese and is Chinese otherwise.
+    """
+    kana = hangul = han = latin = cyrillic = other = 0
+    for ch in text:
+        o = ord(ch)
+        if 0x3040 <= o <= 0x30FF or 0x31F0 <= o <= 0x31FF or 0xFF66 <= o <= 0xFF9D:
+            kana += 1
+        elif 0xAC00 <= o <= 0xD7AF or 0x1100 <= o <= 0x11FF or 0x3130 <= o <= 0x318F:
+            hangul += 1
+        elif 0x4E00 <= o <= 0x9FFF or 0x3400 <= o <= 0x4DBF or 0xF900 <= o <= 0xFAFF:
+            han += 1
+        elif 0x0400 <= o <= 0x04FF:
+            cyrillic += 1
+        elif ch.isalpha():
+            if o < 0x0250 or 0xFF21 <= o <= 0xFF5A:
+                latin += 1
+            else:
+                other += 1
+
+    if kana + hangul + han + latin + cyrillic + other == 0:
+        return None
+    if kana:
+        return "ja"
+    if hangul and hangul >= han and hangul >= latin:
+        return "ko"
+    if han and han >= latin:
+        return "ja" if asr_language == "ja" else "zh"
+    if latin >= cyrillic + other:
+        return asr_language if asr_language in _LATIN_LANGUAGES else "en"
+    if cyrillic >= other:
+        return asr_language or "ru"
+    return asr_language
+
+
+class InferenceCancelled(Exception):
+    """Raised inside translate_segment when its cancel_event is set."""
+
+
+def _check_cancelled(cancel_event: Optional[threading.Event]) -> None:
+    if cancel_event is not None and cancel_event.is_set():
+        raise InferenceCancelled()
+
+
+def _transcribe(
+    model: WhisperModel,
+    audio: np.ndarray,
+    preset: dict,
+    language: Optional[str],
+    cancel_event: Optional[threading.Event] = None,
+) -> tuple[str, bool, Optional[str]]:
+    """Run ASR; returns (text, low_confidence, language).
+
+    language=None lets Whisper detect the language; the detected code is
+    returned in that case. faster-whisper decodes lazily, so cancel_event
+    is checked between the segments it yields (and before the first one);
+    a CTranslate2 generate() call itself cannot be interrupted.
+    """
+    _check_cancelled(cancel_event)
     # NOTE: We keep the call simple and disable VAD so that each audio
     # segment is always transcribed; otherwise short silences can cause
     # "no speech" decisions and the user experience feels like it
     # "stops listening".
-    segments, _info = model.transcribe(
+    segments, info = model.transcribe(
         audio,
         task="transcribe",
-        language="ja",
-        beam_size=beam_size,
-        best_of=best_of,
+        language=language,
+        beam_size=preset["beam_size"],
+        best_of=preset["best_of"],
         vad_filter=False,
         word_timestamps=False,
         temperature=0.0,
         condition_on_previous_text=False,
     )
 
-    ja_texts: list[str] = []
+    texts: list[str] = []
+    logprob_sum = 0.0
+    duration_sum = 0.0
+    max_compression = 0.0
     for segment in segments:
+        if cancel_event is not None and cancel_event.is_set():
+            # Stop the generator so no further windows are decoded.
+            segments.close()
+            raise InferenceCancelled()
         text = segment.text.strip()
         if text:
-            ja_texts.append(text)
+            texts.append(text)
+            span = max(segment.end - segment.start, 1e-3)
+            logprob_sum += segment.avg_logprob * span
+            duration_sum += span
+            max_compression = max(max_compression, segment.compression_ratio)
 
-    if not ja_texts:
+    detected = language or getattr(info, "language", None)
+    if not texts:
+        return "", False, detected
+    mean_logprob = logprob_sum / duration_sum
+    low_confidence = mean_logprob < DRAFT_MIN_AVG_LOGPROB or max_compression > DRAFT_MAX_COMPRESSION_RATIO
+    return " ".join(texts), low_confidence, detected
+
+
+def translate_segment(
+    model: WhisperModel,
+    audio: np.ndarray,
+    sample_rate: int = 16000,
+    mode: str = "translate",
+    language: str | None = None,
+    quality: str = "normal",
+    recheck_model: Optional[Callable[[], WhisperModel]] = None,
+    recheck_quality: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+    stitcher: Optional[TranscriptStitcher] = None,
+) -> str:
+    """Run speech-to-text for a single audio segment.
+
+    - mode="transcribe" -> return the transcription in the spoken language.
+    - mode="translate"  -> transcription, then offline translation to English.
+
+    language: None -> Japanese (the kotoba models are Japanese-specialised),
+    "auto" -> Whisper language detection (Japanese on a checkpoint in
+    JAPANESE_ONLY_MODELS), otherwise a language code. Before
+    MT the text's script is checked: already-English text, or a language
+    with no registered translator, is returned untranslated.
+
+    Draft mode: when ``recheck_model`` is given, ``model`` is treated as a
+    cheap draft decoded with ``quality``. Segments it is unsure about are
+    decoded again by ``recheck_model()`` (only called then, so the larger
+    model is loaded lazily) with ``recheck_quality`` settings.
+
+    cancel_event: checked between decoding windows and before each stage;
+    when set, InferenceCancelled is raised.
+
+    stitcher: for overlapping windows; the ASR text already produced from
+    the previous window's tail is removed before MT.
+    """
+    if audio.size == 0:
         return ""
 
-    ja_full = " ".join(ja_texts)
+    if language is None:
+        asr_language: Optional[str] = "ja"
+    elif language == "auto":
+        model_ids = {quality_preset(q)["model_id"] for q in (quality, recheck_quality) if q}
+        asr_language = "ja" if model_ids & JAPANESE_ONLY_MODELS else None
+    else:
+        asr_language = language
+
+    # Stage 1: Whisper ASR.
+    text, low_confidence, detected = _transcribe(model, audio, quality_preset(quality), asr_language, cancel_event)
+    if recheck_model is not None and low_confidence:
+        _check_cancelled(cancel_event)
+        model_log.debug("draft low confidence, re-checking: %r", text)
+        text, _, detected = _transcribe(
+            recheck_model(),
+            audio,
+            quality_preset(recheck_quality),
+            asr_language,
+            cancel_event,
+        )
+
+    if stitcher is not None:
+        text = stitcher.stitch(text)
+    if not text:
+        return ""
 
-    # If mode is "transcribe", return Japanese as-is.
+    # If mode is "transcribe", return the transcription as-is.
     if mode != "translate":
-        return ja_full
-
-    # Stage 2: offline Japanese -> English translation.
-    # Use device="cpu" here; even if CUDA is available, ASR is the bottleneck.
-    en_text = _ja_to_en(ja_full, device="cpu")
-    return en_text or ja_full
+        return text
+
+    # Stage 2: offline translation, routed on the text's actual script.
+    _check_cancelled(cancel_event)
+    source = detect_text_language(text, detected)
+    if source is None or source == TARGET_LANGUAGE:
+        return text
+    translated = translator_pool.translate(text, source, TARGET_LANGUAGE, device=TRANSLATOR_DEVICE)
+    if translated is None:
+        mt_log.debug("no translator for %s→%s; passing text through", source, TARGET_LANGUAGE)
+        return text
+    return translated or text
@@ -0,0 +1,29 @@
+import pytest
+
+stt_translate = pytest.importorskip("stt_translate")
+detect_text_language = stt_translate.detect_text_language
+
+
+@pytest.mark.parametrize(
+    "text, asr_language, expected",
+    [
+        ("", None, None),
+        ("123 !?", "ja", None),
+        ("こんにちは", None, "ja"),
+        ("漢字とかな", "zh", "ja"),
+        ("안녕하세요", None, "ko"),
+        ("東京大学", "ja", "ja"),
+        ("东京大学", "zh", "zh"),
+        ("東京大学", None, "zh"),
+        ("hello world", None, "en"),
+        ("bonjour le monde", "fr", "fr"),
+        ("hello world", "ja", "en"),
+        ("ＡＢＣ", None, "en"),
+        ("привет мир", None, "ru"),
+        ("привет мир", "uk", "uk"),
+        ("مرحبا", "ar", "ar"),
+        ("مرحبا", None, None),
+    ],
+)
+def test_detect_text_language(text, asr_language, expected):
+    assert detect_text_language(text, asr_language) == expected
@@ -0,0 +1,50 @@
+from stitching import TranscriptStitcher
+
+
+def _stitch_pair(previous: str, text: str, overlap: float = 1.0) -> str:
+    stitcher = TranscriptStitcher(overlap)
+    stitcher.stitch(previous)
+    return stitcher.stitch(text)
+
+
+def test_cjk_overlap_is_removed():
+    assert _stitch_pair("今日はいい天気ですね", "天気ですね。明日も晴れるでしょう") == "明日も晴れるでしょう"
+
+
+def test_word_overlap_is_removed():
+    assert _stitch_pair("we should go to the station now", "the station now and buy tickets") == "and buy tickets"
+
+
+def test_overlap_match_ignores_case_and_punctuation():
+    assert _stitch_pair("we should go to the Station, now.", "the station now and buy tickets") == "and buy tickets"
+
+
+def test_earlier_repeated_phrase_is_not_cut():
+    previous = "I said thank you, and then he said thank you again to me today"
+    assert _stitch_pair(previous, "thank you for coming everyone") == "thank you for coming everyone"
+    assert _stitch_pair("天気ですね、今日は本当に暑いです", "天気ですねと言いました") == "天気ですねと言いました"
+
+
+def test_no_match_passes_text_through():
+    assert _stitch_pair("ありがとうございます。それでは始めます", "今日のテーマは音声認識です") == "今日のテーマは音声認識です"
+    # Different scripts are never aligned.
+    assert _stitch_pair("今日はいい天気ですね", "good morning everyone") == "good morning everyone"
+
+
+def test_first_window_and_zero_overlap_pass_through():
+    assert TranscriptStitcher(1.0).stitch("天気ですね") == "天気ですね"
+    assert _stitch_pair("今日はいい天気ですね", "天気ですね。明日も", overlap=0.0) == "天気ですね。明日も"
+
+
+def test_reset_forgets_previous_window():
+    stitcher = TranscriptStitcher(1.0)
+    stitcher.stitch("今日はいい天気ですね")
+    stitcher.reset()
+    assert stitcher.stitch("天気ですね。明日も晴れるでしょう") == "天気ですね。明日も晴れるでしょう"
+
+
+def test_identical_short_utterance_is_treated_as_overlap():
+    # Intended: text that fits in the overlap and repeats the end of the
+    # previous window is the same speech decoded twice, so nothing is new.
+    assert _stitch_pair("ありがとうございます", "ありがとうございます") == ""
+    assert _stitch_pair("ありがとうございます", "ありがとうございます", overlap=0.0) == "ありがとうございます"